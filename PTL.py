@@ -1,13 +1,44 @@
+import logging
+import re
+import threading
+
 import numpy as np
 import cv2
 
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# 车牌允许出现的字符：省份简称 + 字母（不含I、O）+ 数字
+ALLOWED_CHARS = set(
+    "京津沪渝冀晋辽吉黑苏浙皖闽赣鲁豫鄂湘粤琼川贵云陕甘青蒙桂宁新藏"
+    "ABCDEFGHJKLMNPQRSTUVWXYZ0123456789"
+)
+
+def filter_plate_text(text):
+    # 过滤OCR结果中不属于车牌字符集的字符
+    return "".join([c for c in text if c in ALLOWED_CHARS])
+
+# 车牌格式：省份简称 + 发牌机关字母 + 5 位（蓝牌）或 6 位（新能源绿牌）字母数字
+PLATE_PATTERN = re.compile(
+    "^[京津沪渝冀晋辽吉黑苏浙皖闽赣鲁豫鄂湘粤琼川贵云陕甘青蒙桂宁新藏][A-HJ-NP-Z][A-HJ-NP-Z0-9]{5,6}$"
+)
+
+def is_plate_format(text):
+    # 过滤后的文本是否符合车牌格式
+    return bool(PLATE_PATTERN.match(filter_plate_text(text)))
+
 def detect_plate_corners(cropped_img):
     # 检测图像中的四个角点（近似矩形）
     gray = cv2.cvtColor(cropped_img, cv2.COLOR_BGR2GRAY)
     gray = cv2.bilateralFilter(gray, 11, 17, 17)
     edged = cv2.Canny(gray, 30, 200)
+    return corners_from_edges(edged)
 
-    contours, _ = cv2.findContours(edged.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+def corners_from_edges(edged):
+    # 在边缘图中寻找面积最大的四边形轮廓，返回其四个角点
+    # OpenCV 4 的 findContours 不会修改输入图像，无需拷贝
+    contours, _ = cv2.findContours(edged, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
     contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
 
     for c in contours:
@@ -43,64 +74,206 @@ def four_point_transform(image, pts):
     warped = cv2.warpPerspective(image, m, (max_width, max_height))
     return warped
 
-def plate_recognize(img, box, ocr):
-    try:
-        # 获取边界框坐标
-        x1, y1, x2, y2 = map(int, box[:4])
-        padding = 10
-        # 确保坐标在有效范围内
-        x1, y1 = max(x1 - padding, 0), max(y1 - padding, 0)
-        x2, y2 = min(x2 + padding, img.shape[1] - 1), min(y2 + padding, img.shape[0] - 1)
-        
-        # 检查裁剪区域是否有效
-        if x2 <= x1 or y2 <= y1 or x1 >= img.shape[1] or y1 >= img.shape[0]:
-            return ""
-            
-        cropped_image = img[y1:y2, x1:x2]
-        if cropped_image.size == 0:
-            return ""
+def crop_plate(img, box, padding=10):
+    # 按边界框裁剪车牌区域（带外扩），返回裁剪图及其左上角坐标
+    x1, y1, x2, y2 = map(int, box[:4])
+    # 确保坐标在有效范围内
+    x1, y1 = max(x1 - padding, 0), max(y1 - padding, 0)
+    x2, y2 = min(x2 + padding, img.shape[1] - 1), min(y2 + padding, img.shape[0] - 1)
+
+    # 检查裁剪区域是否有效
+    if x2 <= x1 or y2 <= y1 or x1 >= img.shape[1] or y1 >= img.shape[0]:
+        return None, (x1, y1)
+
+    cropped_image = img[y1:y2, x1:x2]
+    if cropped_image.size == 0:
+        return None, (x1, y1)
+    return cropped_image, (x1, y1)
+
+# 预处理可选的去噪滤波器，开销从高到低
+PREPROCESS_FILTERS = ("bilateral", "median", "gaussian", "box", "none")
 
-        # 图像增强
+class PlatePreprocessor:
+    """
+    融合的车牌预处理：灰度只计算一次，二值图直接用于角点检测（省去 灰度→BGR→灰度 的往返），
+    中间结果写入按尺寸分桶预分配的缓冲区，避免每张车牌重复申请内存。
+    实例持有缓冲区，不能在多个线程间共享。
+    """
+    def __init__(self, filter="bilateral", corner_filter="bilateral", bucket=32):
+        """
+        :param filter: 二值化前的去噪滤波器，取值见 PREPROCESS_FILTERS
+        :param corner_filter: 角点检测前对二值图的额外滤波，默认与原实现一致使用双边滤波，
+                              改为其他取值前应先用 benchmarks/preprocess_bench.py 对比输出
+        :param bucket: 缓冲区尺寸的取整粒度
+        """
+        if filter not in PREPROCESS_FILTERS or corner_filter not in PREPROCESS_FILTERS:
+            raise ValueError(f"未知的滤波器: {filter}, {corner_filter}")
+        self.filter = filter
+        self.corner_filter = corner_filter
+        self.bucket = bucket
+        self._buffers = {}  # (桶高, 桶宽): (gray, filtered, thresh, edged)
+
+    def _get_buffers(self, h, w):
+        key = (-(-h // self.bucket) * self.bucket, -(-w // self.bucket) * self.bucket)
+        buffers = self._buffers.get(key)
+        if buffers is None:
+            buffers = tuple(np.empty(key, dtype=np.uint8) for _ in range(4))
+            self._buffers[key] = buffers
+        return [buf[:h, :w] for buf in buffers]
+
+    @staticmethod
+    def _apply_filter(name, src, dst, bilateral_d=11):
+        # 使用返回值而不是假定原地写入：OpenCV 在无法直接写入 dst 时会另行分配
+        if name == "bilateral":
+            return cv2.bilateralFilter(src, bilateral_d, 17, 17, dst=dst)
+        elif name == "median":
+            return cv2.medianBlur(src, 5, dst=dst)
+        elif name == "gaussian":
+            return cv2.GaussianBlur(src, (5, 5), 0, dst=dst)
+        elif name == "box":
+            return cv2.blur(src, (3, 3), dst=dst)
+        return src
+
+    def __call__(self, cropped_image):
+        """返回送入 OCR 的 BGR 车牌图像（新分配，不与缓冲区共享内存）。"""
+        h, w = cropped_image.shape[:2]
+        gray, filtered, thresh, edged = self._get_buffers(h, w)
         try:
-            gray = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2GRAY)
-            gray = cv2.bilateralFilter(gray, 11, 17, 17)
-            thresh = cv2.adaptiveThreshold(gray, 255,
-                                       cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                       cv2.THRESH_BINARY, 11, 2)
-            processed_img = cv2.cvtColor(thresh, cv2.COLOR_GRAY2BGR)
+            with METRICS.timer("color"):
+                if cropped_image.ndim == 3:
+                    gray = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2GRAY, dst=gray)
+                else:
+                    gray[...] = cropped_image
+            with METRICS.timer("preprocess"):
+                src = self._apply_filter(self.filter, gray, filtered)
+                thresh = cv2.adaptiveThreshold(src, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                               cv2.THRESH_BINARY, 11, 2, dst=thresh)
         except cv2.error:
-            processed_img = cropped_image   # 如果图像处理失败，使用原始裁剪图像
+            logger.debug("车牌预处理失败，使用原始裁剪图像", exc_info=True)
+            return cropped_image.copy()   # 如果图像处理失败，使用原始裁剪图像
 
         # 尝试检测四角点
-        corners = detect_plate_corners(processed_img)
-        if corners is not None:
-            # 将角点坐标映射回原图
-            corners[:, 0] += x1
-            corners[:, 1] += y1
-            warped_img = four_point_transform(processed_img, corners)
-        else:
-            warped_img = processed_img  # 如果检测不到角点，就用原始裁剪图像
+        with METRICS.timer("corners"):
+            src = self._apply_filter(self.corner_filter, thresh, filtered)
+            edged = cv2.Canny(src, 30, 200, edges=edged)
+            corners = corners_from_edges(edged)
+        with METRICS.timer("warp"):
+            if corners is not None:
+                plate = four_point_transform(thresh, corners)
+            else:
+                plate = thresh  # 如果检测不到角点，就用二值化后的裁剪图像
+            # 只在最终的小图上转换一次颜色，同时与缓冲区脱离
+            return cv2.cvtColor(plate, cv2.COLOR_GRAY2BGR)
+
+_local = threading.local()
+
+def get_preprocessor():
+    # 每个线程一个默认预处理器，缓冲区在同一线程内复用
+    preprocessor = getattr(_local, "preprocessor", None)
+    if preprocessor is None:
+        preprocessor = _local.preprocessor = PlatePreprocessor()
+    return preprocessor
+
+def preprocess_plate(cropped_image, preprocessor=None):
+    # 图像增强 + 透视校正，得到送入OCR的车牌图像
+    return (preprocessor or get_preprocessor())(cropped_image)
+
+def parse_ocr_result(item):
+    # 从单条OCR结果中提取 (文本, 置信度)
+    if not item:
+        return "", 0.0
+    try:
+        if 'rec_text' in item:
+            return item['rec_text'], float(item.get('rec_score', 0.0))
+        return "", 0.0
+    except (IndexError, KeyError, TypeError, ValueError):
+        return "", 0.0
+
+def plate_recognize(img, box, ocr):
+    try:
+        cropped_image, _ = crop_plate(img, box)
+        if cropped_image is None:
+            return ""
+
+        warped_img = preprocess_plate(cropped_image)
 
         # OCR识别
-        result = ocr.predict(warped_img)
-        print(result)
+        with METRICS.timer("ocr"):
+            result = ocr.predict(warped_img)
+        logger.debug("OCR 结果: %s", result)
         if not result or not result[0]:
             return ""
 
         # 提取文本
-        if result and len(result) > 0:
-            try:
-                item = result[0]
-                if 'rec_text' in item:
-                    return item['rec_text']
-                else:
-                    return ""
-            except (IndexError, KeyError, TypeError):
-                return ""
+        text, _ = parse_ocr_result(result[0])
+        return text
+
+    except Exception:
+        logger.exception("车牌识别出错")
         return ""
 
+# 批量识别时统一的输入高度（与PP-OCRv5识别模型输入高度一致）
+REC_HEIGHT = 48
+# 宽度分桶粒度与上限，同一个桶内的图像填充到相同尺寸后一次送入OCR
+REC_WIDTH_STEP = 64
+REC_MAX_WIDTH = 320
 
-    except Exception as e:
-        print(f"Error in plate recognition: {str(e)}")
-        return ""
+def pad_to_bucket(img):
+    # 等比缩放到统一高度，并将宽度右侧填充到所在桶的宽度
+    h, w = img.shape[:2]
+    new_w = max(1, min(REC_MAX_WIDTH, int(round(w * REC_HEIGHT / float(h)))))
+    resized = cv2.resize(img, (new_w, REC_HEIGHT))
+    bucket_w = min(REC_MAX_WIDTH, -(-new_w // REC_WIDTH_STEP) * REC_WIDTH_STEP)
+    if bucket_w > new_w:
+        resized = cv2.copyMakeBorder(resized, 0, 0, 0, bucket_w - new_w, cv2.BORDER_REPLICATE)
+    return resized, bucket_w
 
+def recognize_crops(crops, ocr, cache=None, cache_namespace=""):
+    # 对一组已预处理的车牌图像分桶批量OCR，按输入顺序返回 [(文本, 置信度)]
+    # cache 为 result_cache.RecognitionCache 时，相同内容的车牌图像直接复用之前的结果；
+    # cache_namespace 为 OCR 模型名称，不同模型的结果互不复用
+    outputs = [("", 0.0)] * len(crops)
+    buckets = {}
+    keys = {}
+    for idx, crop in enumerate(crops):
+        if crop is None or crop.size == 0:
+            continue
+        if cache is not None:
+            key, entry = cache.lookup_crop(crop, cache_namespace)
+            if entry is not None:
+                outputs[idx] = entry[0]
+                continue
+            keys[idx] = key
+        padded, bucket_w = pad_to_bucket(crop)
+        buckets.setdefault(bucket_w, []).append((idx, padded))
+
+    for items in buckets.values():
+        batch = [padded for _, padded in items]
+        try:
+            with METRICS.timer("ocr") as timer:
+                result = ocr.predict(batch, batch_size=len(batch))
+        except Exception:
+            logger.exception("批量车牌识别出错")
+            continue
+        logger.debug("OCR 结果: %s", result)
+        for (idx, _), item in zip(items, result or []):
+            outputs[idx] = parse_ocr_result(item)
+            if idx in keys:
+                cache.store_crop(keys[idx], outputs[idx], timer.elapsed / len(items))
+    return outputs
+
+def plate_recognize_batch(img, boxes, ocr, with_scores=False, cache=None, cache_namespace=""):
+    # 批量识别同一帧中的所有车牌，结果与 boxes 顺序一致；with_scores 为 True 时返回 [(文本, 置信度)]
+    warped = []
+    for box in boxes:
+        try:
+            with METRICS.timer("crop"):
+                cropped_image, _ = crop_plate(img, box)
+            warped.append(preprocess_plate(cropped_image) if cropped_image is not None else None)
+        except Exception:
+            logger.exception("车牌预处理出错")
+            warped.append(None)
+    outputs = recognize_crops(warped, ocr, cache=cache, cache_namespace=cache_namespace)
+    if with_scores:
+        return outputs
+    return [text for text, _ in outputs]
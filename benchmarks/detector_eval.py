@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+检测后端精度对齐与延迟基准：在 YOLO 格式的验证集上计算各后端的 mAP，
+相对于基准模型（第一个 --models）的 mAP 下降超过阈值时以非零状态退出
+
+    python -m benchmarks.detector_eval --images dataset/val/images \
+        --models runs/detect/train5/weights/best.pt runs/detect/train5/weights/best_int8.onnx --max-drop 0.01
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from detector_backends import load_backend
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def load_labels(image_path, width, height):
+    # 读取 YOLO 格式标注，返回 (类别数组, xyxy 像素坐标数组)
+    label = os.path.splitext(image_path.replace(os.sep + "images" + os.sep, os.sep + "labels" + os.sep))[0] + ".txt"
+    classes, boxes = [], []
+    if os.path.exists(label):
+        with open(label) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 5:
+                    continue
+                c, x, y, w, h = int(parts[0]), *map(float, parts[1:5])
+                classes.append(c)
+                boxes.append([(x - w / 2) * width, (y - h / 2) * height, (x + w / 2) * width, (y + h / 2) * height])
+    return np.array(classes, dtype=np.int64), np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def box_iou(a, b):
+    # a: N×4, b: M×4，返回 N×M 的 IoU 矩阵
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_predictions(pred_boxes, pred_classes, gt_boxes, gt_classes):
+    # 对每个 IoU 阈值做贪心匹配，返回 预测数×阈值数 的 TP 矩阵
+    tp = np.zeros((len(pred_boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    if not len(pred_boxes) or not len(gt_boxes):
+        return tp
+    iou = box_iou(pred_boxes, gt_boxes) * (pred_classes[:, None] == gt_classes[None, :])
+    for t, threshold in enumerate(IOU_THRESHOLDS):
+        used = set()
+        for i in range(len(pred_boxes)):  # 预测已按置信度降序
+            candidates = [j for j in np.argsort(-iou[i]) if iou[i, j] >= threshold and j not in used]
+            if candidates:
+                used.add(candidates[0])
+                tp[i, t] = True
+    return tp
+
+
+def average_precision(tp, confidences, num_gt):
+    # COCO 风格 101 点插值 AP
+    if num_gt == 0 or not len(tp):
+        return np.zeros(len(IOU_THRESHOLDS))
+    order = np.argsort(-confidences)
+    tp = tp[order]
+    ap = np.zeros(tp.shape[1])
+    for t in range(tp.shape[1]):
+        tpc = np.cumsum(tp[:, t])
+        fpc = np.cumsum(~tp[:, t])
+        recall = tpc / num_gt
+        precision = tpc / (tpc + fpc)
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        points = np.linspace(0, 1, 101)
+        idx = np.searchsorted(recall, points, side="left")
+        ap[t] = np.mean([precision[i] if i < len(precision) else 0.0 for i in idx])
+    return ap
+
+
+def evaluate(backend, paths, warmup=3):
+    """返回 (mAP50, mAP50-95, 单张延迟毫秒数组)。"""
+    for path in paths[:warmup]:
+        backend([cv2.imread(path)])
+    stats = {}  # 类别: [tp 列表, 置信度列表, 真值数]
+    latencies = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        gt_classes, gt_boxes = load_labels(path, image.shape[1], image.shape[0])
+        start = time.perf_counter()
+        det = backend([image])[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        order = np.argsort(-det.confidences)
+        boxes, confidences, classes = det.boxes[order], det.confidences[order], det.classes[order]
+        tp = match_predictions(boxes, classes, gt_boxes, gt_classes)
+        for c in set(gt_classes.tolist()) | set(classes.tolist()):
+            entry = stats.setdefault(c, [[], [], 0])
+            entry[0].append(tp[classes == c])
+            entry[1].append(confidences[classes == c])
+            entry[2] += int((gt_classes == c).sum())
+    aps = [average_precision(np.concatenate(tps), np.concatenate(confs), n)
+           for tps, confs, n in stats.values() if n > 0]
+    if not aps:
+        return 0.0, 0.0, np.array(latencies)
+    aps = np.mean(aps, axis=0)
+    return float(aps[0]), float(aps.mean()), np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测后端 mAP 对齐与延迟基准")
+    parser.add_argument("--images", required=True, help="YOLO 格式验证集的 images 目录")
+    parser.add_argument("--models", nargs="+", required=True, help="待比较的模型，第一个作为基准")
+    parser.add_argument("--limit", type=int, default=500, help="最多评估多少张图片")
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime 推理线程数")
+    parser.add_argument("--max-drop", type=float, default=0.01, help="允许的 mAP50-95 最大下降")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jpg")) + glob.glob(os.path.join(args.images, "*.png")))
+    paths = paths[:args.limit]
+    print(f"评估 {len(paths)} 张图片")
+    print(f"{'模型':<48}{'mAP50':>8}{'mAP50-95':>10}{'p50 ms':>9}{'p95 ms':>9}")
+
+    baseline = None
+    failed = False
+    for model_path in args.models:
+        map50, map5095, latencies = evaluate(load_backend(model_path, threads=args.threads), paths)
+        print(f"{model_path:<48}{map50:>8.4f}{map5095:>10.4f}"
+              f"{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 95):>9.2f}")
+        if baseline is None:
+            baseline = map5095
+        elif baseline - map5095 > args.max_drop:
+            print(f"  mAP50-95 下降 {baseline - map5095:.4f}，超过阈值 {args.max_drop}")
+            failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+识别结果显示路径基准：对比原先“拷贝 → BGR→RGB → 标注副本 → RGB→BGR → BGR→RGB → QImage”
+与现在“复用画布标注 → BGR888 QImage”的单帧耗时与新分配内存（实测），
+以及按各路径整帧处理次数估算的读写量（非实测）
+
+    python -m benchmarks.frame_path_bench --size 3840x2160 --frames 50
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from recognizer import draw_detections
+
+
+def make_frame(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 2)
+    boxes = [[width * 0.3, height * 0.6, width * 0.45, height * 0.66], [width * 0.6, height * 0.5, width * 0.7, height * 0.55]]
+    return frame, boxes, [0.91, 0.78], [0, 1]
+
+
+def load_qt():
+    # 没有安装 PyQt5 时只测量 numpy / OpenCV 部分
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtGui import QGuiApplication, QImage, QPixmap
+    except ImportError:
+        return None
+    app = QGuiApplication.instance() or QGuiApplication([])
+    return app, QImage, QPixmap
+
+
+def legacy_path(frame, boxes, confs, classes, qt):
+    image = frame.copy()
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)                       # 送入 YOLO 前转 RGB
+    annotated = draw_detections(rgb, boxes, confs, classes)            # results[0].plot() 在副本上绘制
+    processed = cv2.cvtColor(annotated, cv2.COLOR_RGB2BGR)             # 存为 processed_cv
+    display = cv2.cvtColor(processed, cv2.COLOR_BGR2RGB)               # cv2_to_pixmap
+    if qt is not None:
+        _, QImage, QPixmap = qt
+        QPixmap.fromImage(QImage(display.data, display.shape[1], display.shape[0], display.strides[0],
+                                 QImage.Format_RGB888))
+    return 5  # 代码中的整帧处理次数（拷贝 + 3 次颜色转换 + 标注副本），不含 Qt，用于估算读写量
+
+
+def zero_copy_path(frame, boxes, confs, classes, qt, buffer):
+    display = draw_detections(frame, boxes, confs, classes, out=buffer)
+    if qt is not None:
+        _, QImage, QPixmap = qt
+        QPixmap.fromImage(QImage(display.data, display.shape[1], display.shape[0], display.strides[0],
+                                 QImage.Format_BGR888))
+    return 1  # 标注时整帧拷贝到画布一次
+
+
+def measure(fn, frames):
+    fn()  # 预热
+    tracemalloc.start()
+    allocated = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        passes = fn()
+        allocated += tracemalloc.get_traced_memory()[1] - base
+    elapsed = (time.perf_counter() - start) / frames
+    tracemalloc.stop()
+    return elapsed, allocated / frames, passes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别结果显示路径基准")
+    parser.add_argument("--size", default="1920x1080", help="帧尺寸，宽x高")
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    frame, boxes, confs, classes = make_frame(width, height)
+    buffer = np.empty_like(frame)
+    qt = load_qt()
+    frame_mb = frame.nbytes / 1e6
+    print(f"帧 {width}x{height}（{frame_mb:.1f} MB），Qt: {'已包含' if qt else '未安装，跳过'}")
+    print("估算读写量 = 整帧处理次数 × 2 × 帧大小（每次读一遍、写一遍），估算带宽 = 估算读写量 / 实测耗时")
+    print(f"{'路径':<12}{'耗时(ms)':>10}{'新分配(MB)':>12}{'估算读写(MB)':>14}{'估算带宽(GB/s)':>16}")
+    for name, fn in (("legacy", lambda: legacy_path(frame, boxes, confs, classes, qt)),
+                     ("zero-copy", lambda: zero_copy_path(frame, boxes, confs, classes, qt, buffer))):
+        elapsed, allocated, passes = measure(fn, args.frames)
+        traffic = passes * 2 * frame.nbytes  # 由假定的处理次数推算，并非测量值
+        print(f"{name:<12}{elapsed * 1000:>10.2f}{allocated / 1e6:>12.1f}{traffic / 1e6:>14.1f}"
+              f"{traffic / elapsed / 1e9:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+闸口服务负载生成与吞吐量基准：多个车道线程同时提交入场/出场事件（包含同一车牌在两个车道
+同时出现的竞争情况），结束后校验没有丢失或重复计数的会话
+
+    python -m benchmarks.gate_load --lanes 16 --plates 5000 --events 200000
+"""
+import argparse
+import random
+import threading
+import time
+
+from gate_service import GateService
+from parking import ParkingLot
+
+
+class _NoRecognizer:
+    # 基准只测试闸口逻辑，不加载识别模型
+    pass
+
+
+def lane_worker(service, lane, plates, events, seed, futures):
+    rng = random.Random(seed)
+    for _ in range(events):
+        plate = rng.choice(plates)
+        kind = "enter" if rng.random() < 0.5 else "exit"
+        futures.append(service.submit(lane, plate, kind))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="闸口服务吞吐量基准")
+    parser.add_argument("--lanes", type=int, default=16, help="车道数（生成事件的线程数）")
+    parser.add_argument("--plates", type=int, default=5000, help="车牌数量，越少竞争越激烈")
+    parser.add_argument("--events", type=int, default=200000, help="事件总数")
+    parser.add_argument("--workers", type=int, default=8, help="服务线程数")
+    parser.add_argument("--shards", type=int, default=64, help="锁分片数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    plates = [f"京A{i:05d}" for i in range(args.plates)]
+    lot = ParkingLot(recognizer=_NoRecognizer())
+    service = GateService(lot, workers=args.workers, shards=args.shards)
+
+    per_lane = args.events // args.lanes
+    futures = [[] for _ in range(args.lanes)]
+    threads = [threading.Thread(target=lane_worker,
+                                args=(service, lane, plates, per_lane, args.seed + lane, futures[lane]))
+               for lane in range(args.lanes)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results = [f.result() for lane_futures in futures for f in lane_futures]
+    service.shutdown()
+    elapsed = time.perf_counter() - start
+
+    # 校验：成功入场数 = 成功出场数 + 仍在场数，且每次成功出场都恰好生成一条历史记录
+    entered = sum(1 for r in results if r.ok and r.event.kind == "enter")
+    exited = sum(1 for r in results if r.ok and r.event.kind == "exit")
+    sessions = sum(len(v) for v in lot.history.values())
+    fees = [r.fee.result() for r in results if r.fee is not None]
+    consistent = entered == exited + len(lot.active_vehicles) and sessions == exited == len(fees)
+
+    print(f"事件 {len(results)}，用时 {elapsed:.2f} 秒，吞吐量 {len(results) / elapsed:.0f} 事件/秒")
+    print(f"入场 {entered}，出场 {exited}，在场 {len(lot.active_vehicles)}，历史记录 {sessions}，"
+          f"拒绝 {service.stats['rejected']}")
+    print("一致性校验：" + ("通过" if consistent else "失败"))
+    if not consistent:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
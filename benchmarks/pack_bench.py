@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+训练数据读取基准：对比逐个打开 JPEG 解码并 letterbox 与从打包缓存内存映射读取的吞吐量
+
+    python -m benchmarks.pack_bench --images dataset/train/images --packed dataset/packed/train
+"""
+import argparse
+import glob
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from utils.pack_dataset import PackedDataset, letterbox
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练数据读取基准")
+    parser.add_argument("--images", required=True, help="原始 images 目录")
+    parser.add_argument("--packed", required=True, help="对应子集的打包目录")
+    parser.add_argument("--limit", type=int, default=2000, help="读取的图片数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    packed = PackedDataset(args.packed)
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jpg")) + glob.glob(os.path.join(args.images, "*.png")))
+    order = list(range(min(args.limit, len(paths), len(packed))))
+    random.Random(args.seed).shuffle(order)  # 训练时随机访问
+
+    start = time.perf_counter()
+    for i in order:
+        letterbox(cv2.imread(paths[i]), packed.imgsz)
+    decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in order:
+        np.array(packed.image(i))  # 拷贝出来，与训练时一致
+    mapped = time.perf_counter() - start
+
+    n = len(order)
+    print(f"{n} 张图片（随机顺序）")
+    print(f"JPEG 解码 + letterbox: {n / decode:8.1f} 张/秒")
+    print(f"内存映射读取:          {n / mapped:8.1f} 张/秒（{decode / mapped:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+端到端基准：在固定的 CCPD 测试样本上运行 YOLO + PTL 识别流水线，报告吞吐量、各阶段延迟分位数、
+峰值内存与车牌完全匹配准确率（真值从 CCPD 文件名解码），输出 JSON 报告并可与历史报告对比
+
+    python -m benchmarks.pipeline_bench --images CCPD2019/ccpd_base --limit 500 -o bench.json
+    python -m benchmarks.pipeline_bench --images CCPD2019/ccpd_base --limit 500 --compare bench.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+
+import cv2
+
+from metrics import METRICS
+from models import DEFAULT_FAST_OCR_MODEL, DEFAULT_MODEL_PATH, DEFAULT_OCR_MODEL
+from recognizer import PlateRecognizer
+
+# CCPD 文件名中车牌字段的编码表
+PROVINCES = ["皖", "沪", "津", "渝", "冀", "晋", "蒙", "辽", "吉", "黑", "苏", "浙", "京", "闽", "赣", "鲁", "豫",
+             "鄂", "湘", "粤", "桂", "琼", "川", "贵", "云", "藏", "陕", "甘", "青", "宁", "新", "警", "学", "O"]
+ALPHABETS = ["A", "B", "C", "D", "E", "F", "G", "H", "J", "K", "L", "M", "N", "P", "Q", "R", "S", "T", "U", "V",
+             "W", "X", "Y", "Z", "O"]
+ADS = ALPHABETS[:-1] + ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "O"]
+
+
+def decode_ccpd_name(path):
+    """
+    从 CCPD 文件名解码真值
+    :return: (车牌号, [x1, y1, x2, y2])，文件名不符合 CCPD 格式时返回 (None, None)
+    """
+    fields = os.path.splitext(os.path.basename(path))[0].split("-")
+    if len(fields) < 5:
+        return None, None
+    try:
+        (x1, y1), (x2, y2) = [map(int, p.split("&")) for p in fields[2].split("_")]
+        indices = [int(i) for i in fields[4].split("_")]
+        plate = PROVINCES[indices[0]] + ALPHABETS[indices[1]] + "".join(ADS[i] for i in indices[2:])
+    except (ValueError, IndexError):
+        return None, None
+    return plate, [x1, y1, x2, y2]
+
+
+def iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def select_sample(images_dir, limit, seed):
+    # 固定样本：文件名排序后按种子抽样，与目录遍历顺序无关
+    names = sorted(e.name for e in os.scandir(images_dir) if e.name.lower().endswith((".jpg", ".png")))
+    random.Random(seed).shuffle(names)
+    names = sorted(names[:limit])
+    digest = hashlib.sha1("\n".join(names).encode("utf-8")).hexdigest()[:12]
+    return [os.path.join(images_dir, n) for n in names], digest
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run(recognizer, paths, warmup=3):
+    for path in paths[:warmup]:
+        recognizer.recognize_file(path)
+    METRICS.reset()
+    if recognizer.cascade is not None:
+        recognizer.cascade.reset()
+
+    images = exact = detected = labelled = 0
+    start = time.perf_counter()
+    for path in paths:
+        truth, truth_box = decode_ccpd_name(path)
+        try:
+            result = recognizer.recognize_file(path)
+        except ValueError:
+            continue
+        images += 1
+        if truth is None:
+            continue
+        labelled += 1
+        exact += truth in result.texts
+        detected += any(iou(box, truth_box) >= 0.5 for box in result.boxes)
+    elapsed = time.perf_counter() - start
+
+    stages = {stage: {k: (v * 1000 if k != "count" else v) for k, v in s.items() if k != "sum"}
+              for stage, s in METRICS.snapshot().items()}
+    return {
+        "images": images,
+        "seconds": elapsed,
+        "images_per_sec": images / elapsed if elapsed else 0.0,
+        "exact_match": exact / labelled if labelled else 0.0,
+        "detection_recall": detected / labelled if labelled else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages_ms": stages,
+        "cascade": recognizer.cascade.stats() if recognizer.cascade is not None else None,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """返回回退项列表：吞吐量下降、p95 延迟上升超过 tolerance 比例，或准确率下降超过 0.5 个百分点。"""
+    regressions = []
+    old, new = baseline["results"], report["results"]
+    if new["images_per_sec"] < old["images_per_sec"] * (1 - tolerance):
+        regressions.append(f"吞吐量 {old['images_per_sec']:.2f} -> {new['images_per_sec']:.2f} 张/秒")
+    for key in ("exact_match", "detection_recall"):
+        if new[key] < old[key] - 0.005:
+            regressions.append(f"{key} {old[key]:.4f} -> {new[key]:.4f}")
+    for stage, s in new["stages_ms"].items():
+        before = old["stages_ms"].get(stage)
+        if before and s["p95"] > before["p95"] * (1 + tolerance) and s["p95"] - before["p95"] > 0.5:
+            regressions.append(f"{stage} p95 {before['p95']:.2f} -> {s['p95']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="车牌识别端到端基准")
+    parser.add_argument("--images", required=True, help="CCPD 原始图片目录（文件名包含真值）")
+    parser.add_argument("--limit", type=int, default=300, help="样本数")
+    parser.add_argument("--seed", type=int, default=0, help="抽样种子")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--ocr-model", default=DEFAULT_OCR_MODEL)
+    parser.add_argument("--fast-ocr-model", default=DEFAULT_FAST_OCR_MODEL, help="级联识别的快速模型，传空字符串关闭级联")
+    parser.add_argument("-o", "--output", help="报告输出路径（JSON）")
+    parser.add_argument("--compare", help="与该历史报告对比，出现回退时以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="吞吐量与延迟允许的相对变化")
+    args = parser.parse_args()
+
+    paths, digest = select_sample(args.images, args.limit, args.seed)
+    recognizer = PlateRecognizer(args.model, args.ocr_model, fast_ocr_model=args.fast_ocr_model or None)
+    report = {
+        "sample": {"dir": os.path.abspath(args.images), "count": len(paths), "seed": args.seed, "digest": digest},
+        "config": {"model": args.model, "ocr_model": args.ocr_model, "fast_ocr_model": args.fast_ocr_model},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "opencv": cv2.__version__},
+        "results": run(recognizer, paths),
+    }
+
+    r = report["results"]
+    print(f"{r['images']} 张图片，{r['images_per_sec']:.2f} 张/秒，完全匹配 {r['exact_match']:.2%}，"
+          f"检测召回 {r['detection_recall']:.2%}，峰值内存 {r['peak_rss_mb']:.0f} MB")
+    print(f"{'阶段':<12}{'次数':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in r["stages_ms"].items():
+        print(f"{stage:<12}{s['count']:>8}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['p99']:>10.2f}")
+    if r["cascade"]:
+        c = r["cascade"]
+        print(f"级联识别：快速模型直接通过 {c['fast_rate']:.1%}，升级后通过 {c['accurate_rate']:.1%}，"
+              f"未通过格式校验 {c['failed_rate']:.1%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["sample"]["digest"] != digest:
+            print("[警告] 样本与历史报告不同，对比结果仅供参考")
+        regressions = compare(report, baseline, args.tolerance)
+        for item in regressions:
+            print(f"回退: {item}")
+        if regressions:
+            raise SystemExit(1)
+        print("与历史报告相比没有回退")
+
+
+if __name__ == "__main__":
+    main()
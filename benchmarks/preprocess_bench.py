@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+车牌预处理微基准：对比原先逐步分配内存的预处理链与 PTL.PlatePreprocessor 的单张耗时
+
+    python -m benchmarks.preprocess_bench --images dataset/test/images --crops 500
+"""
+import argparse
+import glob
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from PTL import PREPROCESS_FILTERS, PlatePreprocessor, corners_from_edges, four_point_transform
+
+
+def legacy_preprocess(cropped_image):
+    # 优化前的实现：灰度→双边滤波→二值化→转回BGR，角点检测时再转灰度、第二次双边滤波、Canny
+    try:
+        gray = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2GRAY)
+        gray = cv2.bilateralFilter(gray, 11, 17, 17)
+        thresh = cv2.adaptiveThreshold(gray, 255,
+                                       cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                       cv2.THRESH_BINARY, 11, 2)
+        processed_img = cv2.cvtColor(thresh, cv2.COLOR_GRAY2BGR)
+    except cv2.error:
+        processed_img = cropped_image
+    gray = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
+    gray = cv2.bilateralFilter(gray, 11, 17, 17)
+    corners = corners_from_edges(cv2.Canny(gray, 30, 200))
+    if corners is not None:
+        return four_point_transform(processed_img, corners)
+    return processed_img
+
+
+def agreement(fn, crops, reference):
+    # 与原实现输出完全一致的车牌比例，作为改动滤波器后识别准确率是否受影响的代理指标
+    same = 0
+    for crop, expected in zip(crops, reference):
+        out = fn(crop)
+        same += out.shape == expected.shape and np.array_equal(out, expected)
+    return same / len(crops)
+
+
+def load_crops(image_dir, count, seed):
+    # 优先从 YOLO 格式数据集（images/ 与 labels/ 同级）中按标注裁剪车牌，否则生成合成车牌图像
+    rng = random.Random(seed)
+    crops = []
+    if image_dir:
+        paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")))
+        rng.shuffle(paths)
+        for path in paths[:count]:
+            label = os.path.splitext(path.replace(os.sep + "images" + os.sep, os.sep + "labels" + os.sep))[0] + ".txt"
+            img = cv2.imread(path)
+            if img is None or not os.path.exists(label):
+                continue
+            h, w = img.shape[:2]
+            with open(label) as f:
+                _, x, y, bw, bh = map(float, f.readline().split()[:5])
+            x1, y1 = int((x - bw / 2) * w) - 10, int((y - bh / 2) * h) - 10
+            x2, y2 = int((x + bw / 2) * w) + 10, int((y + bh / 2) * h) + 10
+            crop = img[max(y1, 0):y2, max(x1, 0):x2]
+            if crop.size:
+                crops.append(np.ascontiguousarray(crop))
+    np_rng = np.random.default_rng(seed)
+    while len(crops) < count:
+        h, w = rng.randint(40, 120), rng.randint(140, 400)
+        crop = np_rng.integers(0, 80, (h, w, 3), dtype=np.uint8)
+        cv2.rectangle(crop, (8, 6), (w - 8, h - 6), (200, 120, 30), -1)
+        cv2.putText(crop, "A12345", (16, h - 12), cv2.FONT_HERSHEY_SIMPLEX, h / 40.0, (255, 255, 255), 2)
+        crops.append(crop)
+    return crops
+
+
+def bench(fn, crops, repeat):
+    fn(crops[0])  # 预热
+    timings = []
+    for _ in range(repeat):
+        for crop in crops:
+            start = time.perf_counter()
+            fn(crop)
+            timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return timings.mean(), np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="车牌预处理微基准")
+    parser.add_argument("--images", help="YOLO 格式数据集的 images 目录，不指定则使用合成车牌")
+    parser.add_argument("--crops", type=int, default=300, help="车牌数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复轮数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    crops = load_crops(args.images, args.crops, args.seed)
+    reference = [legacy_preprocess(crop) for crop in crops]
+    print(f"{len(crops)} 张车牌，单张耗时（毫秒），一致率为输出与原实现完全相同的比例")
+    print(f"{'实现':<28}{'平均':>8}{'p50':>8}{'p95':>8}{'一致率':>8}")
+    mean, p50, p95 = bench(legacy_preprocess, crops, args.repeat)
+    print(f"{'legacy':<28}{mean:>8.3f}{p50:>8.3f}{p95:>8.3f}{1:>9.1%}")
+    for name in PREPROCESS_FILTERS:
+        for corner_filter in ("bilateral", "none"):
+            preprocessor = PlatePreprocessor(filter=name, corner_filter=corner_filter)
+            mean, p50, p95 = bench(preprocessor, crops, args.repeat)
+            same = agreement(PlatePreprocessor(filter=name, corner_filter=corner_filter), crops, reference)
+            print(f"{'fused/' + name + '+' + corner_filter:<28}{mean:>8.3f}{p50:>8.3f}{p95:>8.3f}{same:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
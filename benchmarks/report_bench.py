@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+报表基准：一年的停车会话上，SQLite 逐行查询 / Python 循环与 NumPy 列式向量化计算的耗时对比
+（按日收入、峰值在场车辆数、停车时长分位数、分段计价重算）
+
+    python -m benchmarks.report_bench --sessions 2000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from reports import SessionHistory, TieredPricing
+from storage import SessionStore
+
+YEAR_START = 1704038400.0  # 2024-01-01 00:00 北京时间
+DAY = 86400
+
+
+def synthesize(count, seed=0):
+    """生成一年的会话：入场集中在白天，停车时长为对数正态分布（中位数约 1.5 小时）。"""
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 365, count)
+    hour = np.clip(rng.normal(13, 4, count), 0, 23.99)
+    enter = YEAR_START + days * DAY + hour * 3600
+    exit = enter + np.exp(rng.normal(np.log(5400), 0.9, count))
+    plates = [f"京A{i:05d}" for i in rng.integers(0, 50000, count)]
+    return plates, enter, exit, np.round((exit - enter) / 3600 * 5, 2)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def python_peak(rows):
+    events = sorted([(e, 1) for _, e, _, _ in rows] + [(x, -1) for _, _, x, _ in rows],
+                    key=lambda item: (item[0], item[1]))
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def python_percentiles(rows, qs=(50, 90, 95, 99)):
+    dwell = sorted(x - e for _, e, x, _ in rows)
+    return {q: dwell[min(int(len(dwell) * q / 100), len(dwell) - 1)] for q in qs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话报表基准")
+    parser.add_argument("--sessions", type=int, default=1000000, help="一年内的会话数")
+    args = parser.parse_args()
+
+    plates, enter, exit, fee = synthesize(args.sessions)
+    t1, t2 = YEAR_START, YEAR_START + 366 * DAY
+    pricing = TieredPricing(tiers=((1, 8.0), (4, 5.0), (None, 3.0)), free_minutes=15, daily_cap=60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "bench.db"), batch_size=10 ** 9)
+        with store._conn:
+            store._conn.executemany("INSERT INTO sessions (plate, enter_time, exit_time, fee) VALUES (?, ?, ?, ?)",
+                                    zip(plates, enter.tolist(), exit.tolist(), fee.tolist()))
+        print(f"{args.sessions} 条会话（一年）")
+
+        sql = {}
+        sql["按日收入"], _ = timed(lambda: store.revenue_by_bucket(t1, t2, DAY))
+        load_rows, rows = timed(lambda: store.exited_between(t1, t2))
+        sql["峰值在场"], _ = timed(lambda: python_peak(rows))
+        sql["时长分位数"], _ = timed(lambda: python_percentiles(rows))
+        sql["分段计价重算"], _ = timed(lambda: [pricing.fee(e, x) for _, e, x, _ in rows[:100000]])
+        sql["分段计价重算"] *= len(rows) / min(len(rows), 100000)  # 逐条计价按前 10 万条外推
+
+        load_history, history = timed(lambda: SessionHistory.from_store(store))
+        store.close()
+
+    vec = {}
+    vec["按日收入"], _ = timed(lambda: history.revenue_by_period(t1, t2, "day"))
+    vec["峰值在场"], (peak, _) = timed(lambda: history.peak_occupancy())
+    vec["时长分位数"], dwell = timed(lambda: history.dwell_percentiles())
+    vec["分段计价重算"], (_, total) = timed(lambda: history.reprice(pricing))
+    report_seconds, report = timed(lambda: history.summary(t1, t2, "month"))
+
+    print(f"读取：SQLite 查询 {load_rows:.2f} 秒，加载列式历史 {load_history:.2f} 秒（启动时一次）")
+    print(f"{'报表':<10}{'逐行 (ms)':>14}{'向量化 (ms)':>14}{'加速':>8}")
+    for name in sql:
+        print(f"{name:<10}{sql[name] * 1000:>14.1f}{vec[name] * 1000:>14.1f}{sql[name] / vec[name]:>7.0f}x")
+    print(f"全年汇总报表（按月收入 + 峰值 + 分位数）：{report_seconds * 1000:.1f} 毫秒，"
+          f"收入 {report['revenue']:.0f} 元，峰值在场 {peak} 辆，"
+          f"p50 / p99 停车时长 {dwell[50] / 60:.0f} / {dwell[99] / 60:.0f} 分钟，新计价合计 {total:.0f} 元")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+识别服务负载测试：按不同并发数向 server.py 发送识别请求，报告吞吐量、延迟与被拒绝（503）的比例
+
+    python server.py --port 8080 &
+    python -m benchmarks.server_load --url http://127.0.0.1:8080 --images dataset/test/images --concurrency 1,2,4,8,16
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import cv2
+import numpy as np
+
+
+def load_payloads(image_dir, limit):
+    # 读取图片文件内容作为请求体；未指定目录时生成合成图片
+    payloads = []
+    if image_dir:
+        for path in sorted(glob.glob(os.path.join(image_dir, "*.jpg")))[:limit]:
+            with open(path, "rb") as f:
+                payloads.append(f.read())
+    if not payloads:
+        rng = np.random.default_rng(0)
+        for _ in range(min(limit, 8)):
+            image = cv2.GaussianBlur(rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8), (0, 0), 3)
+            payloads.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return payloads
+
+
+def post(url, payload, timeout):
+    request = urllib.request.Request(url, data=payload, headers={"Content-Type": "image/jpeg"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0  # 连接失败或超时
+
+
+def run_level(url, payloads, concurrency, duration, timeout):
+    latencies, statuses = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(offset):
+        index = offset
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            status = post(url, payloads[index % len(payloads)], timeout)
+            elapsed = time.perf_counter() - start
+            index += concurrency
+            with lock:
+                statuses.append(status)
+                if status == 200:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ok = len(latencies)
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "requests": len(statuses),
+        "ok": ok,
+        "rejected": sum(1 for s in statuses if s == 503),
+        "errors": sum(1 for s in statuses if s not in (200, 503)),
+        "throughput": ok / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别服务负载测试")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="服务地址")
+    parser.add_argument("--images", help="图片目录，不指定则使用合成图片")
+    parser.add_argument("--limit", type=int, default=200, help="最多读取的图片数")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="逗号分隔的并发数列表")
+    parser.add_argument("--duration", type=float, default=10, help="每个并发级别的持续时间（秒）")
+    parser.add_argument("--timeout", type=float, default=60, help="单个请求的超时时间（秒）")
+    parser.add_argument("-o", "--output", help="结果输出路径（JSON）")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/")
+    payloads = load_payloads(args.images, args.limit)
+    with urllib.request.urlopen(url + "/health", timeout=args.timeout) as response:
+        print("服务状态:", json.loads(response.read())["status"])
+
+    print(f"{'并发':>6}{'请求':>8}{'成功':>8}{'503':>6}{'错误':>6}{'吞吐(张/秒)':>14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    levels = []
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        r = run_level(url + "/recognize", payloads, concurrency, args.duration, args.timeout)
+        levels.append(r)
+        print(f"{r['concurrency']:>6}{r['requests']:>8}{r['ok']:>8}{r['rejected']:>6}{r['errors']:>6}"
+              f"{r['throughput']:>14.2f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+    with urllib.request.urlopen(url + "/health", timeout=args.timeout) as response:
+        health = json.loads(response.read())
+    print(f"服务端平均批大小 {health['mean_batch_size']:.2f}，拒绝 {health['rejected']} 次")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"levels": levels, "server": health}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+闸口识别结果去重：
+1. 同一帧内不分类别（蓝牌 / 绿牌）的非极大值抑制，重叠的检测框只保留置信度最高的一个再做 OCR
+2. 按车道的近期车牌缓存，同一车牌在时间窗口内重复触发时直接丢弃，不再更新停车场状态
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def nms(boxes, confidences, iou_threshold=0.5):
+    """
+    不分类别的非极大值抑制
+    :param boxes: [[x1, y1, x2, y2]]
+    :param confidences: 与 boxes 对应的置信度
+    :param iou_threshold: 与已保留框的 IoU 超过该值的框被抑制
+    :return: 保留的下标列表，按原始顺序排列
+    """
+    if len(boxes) < 2:
+        return list(range(len(boxes)))
+    boxes = np.asarray(boxes, dtype=np.float64)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-np.asarray(confidences, dtype=np.float64), kind="stable")
+    keep = []
+    while len(order):
+        i, rest = order[0], order[1:]
+        keep.append(int(i))
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return sorted(keep)
+
+
+class RecentPlates:
+    def __init__(self, window=10.0, max_entries=4096):
+        """
+        :param window: 同一车道同一车牌在该时间（秒）内再次出现视为重复触发
+        :param max_entries: 最多记录的 (车道, 车牌) 数，超出时淘汰最久未出现的
+        """
+        self.window = window
+        self.max_entries = max_entries
+        self._seen = OrderedDict()  # (车道, 车牌号): 最近一次出现的时间，按时间先后排列
+        self._lock = threading.Lock()
+        self.stats = {"passed": 0, "suppressed": 0}
+
+    def check(self, lane, plate, timestamp=None):
+        """
+        登记一次车牌出现
+        :return: True 表示首次触发，应继续处理；False 表示窗口内的重复触发
+        车辆停在闸口前会被连续识别，每次出现都会刷新时间，离开满一个窗口后才会再次触发
+        """
+        now = time.time() if timestamp is None else timestamp
+        key = (lane, plate)
+        with self._lock:
+            while self._seen:
+                oldest_key, oldest = next(iter(self._seen.items()))
+                if now - oldest < self.window and len(self._seen) < self.max_entries:
+                    break
+                del self._seen[oldest_key]
+            last = self._seen.pop(key, None)
+            self._seen[key] = now if last is None else max(last, now)
+            duplicate = last is not None and now - last < self.window
+            self.stats["suppressed" if duplicate else "passed"] += 1
+        return not duplicate
+
+    def forget(self, lane, plate):
+        """撤销一次登记，例如闸口操作失败后允许立即重试。"""
+        with self._lock:
+            self._seen.pop((lane, plate), None)
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
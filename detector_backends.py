@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+可替换的车牌检测后端：ultralytics（.pt / OpenVINO 导出目录）与 ONNX Runtime（.onnx，可选 INT8 静态量化）
+
+    python detector_backends.py export --int8 --calib dataset/val/images
+"""
+import argparse
+import glob
+import logging
+import os
+import random
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 单张图像的检测结果：boxes 为 N×4 的 xyxy，raw 为后端原始结果（ultralytics 的 Results，其他后端为 None）
+Detections = namedtuple("Detections", ["boxes", "confidences", "classes", "raw"])
+
+
+class UltralyticsBackend:
+    def __init__(self, model_path):
+        """
+        :param model_path: .pt 权重，或 ultralytics 导出的 OpenVINO / ONNX 模型
+        """
+        from ultralytics import YOLO
+        self.model_path = model_path
+        self.model = YOLO(model_path, task='detect')
+
+    def __call__(self, images, **kwargs):
+        """对 BGR 图像列表做批量检测，返回 [Detections]。"""
+        outputs = []
+        for result in self.model(images, verbose=False, **kwargs):
+            boxes = result.boxes
+            xyxy, conf, cls = boxes.xyxy, boxes.conf, boxes.cls
+            if hasattr(xyxy, 'cpu'):
+                xyxy, conf, cls = xyxy.cpu().numpy(), conf.cpu().numpy(), cls.cpu().numpy()
+            outputs.append(Detections(np.asarray(xyxy, dtype=np.float32), np.asarray(conf, dtype=np.float32),
+                                      np.asarray(cls, dtype=np.int64), result))
+        return outputs
+
+
+def letterbox(image, size=640, color=(114, 114, 114)):
+    # 等比缩放并填充到 size×size，返回 (图像, 缩放比例, (左填充, 上填充))
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    left, top = (size - new_w) // 2, (size - new_h) // 2
+    image = cv2.copyMakeBorder(image, top, size - new_h - top, left, size - new_w - left,
+                               cv2.BORDER_CONSTANT, value=color)
+    return image, scale, (left, top)
+
+
+class OnnxBackend:
+    def __init__(self, onnx_path, threads=None, imgsz=640, conf=0.25, iou=0.7):
+        """
+        :param onnx_path: ultralytics 导出的 ONNX 模型（输出形状 1×(4+类别数)×N）
+        :param threads: ONNX Runtime 算子内线程数，默认由运行时决定
+        :param conf: 置信度阈值，与 ultralytics 预测默认值一致
+        :param iou: NMS 的 IoU 阈值
+        """
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.model_path = onnx_path
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def preprocess(self, images):
+        batch = np.empty((len(images), 3, self.imgsz, self.imgsz), dtype=np.float32)
+        metas = []
+        for i, image in enumerate(images):
+            padded, scale, pad = letterbox(image, self.imgsz)
+            # BGR→RGB、HWC→CHW、归一化一次完成
+            batch[i] = padded[:, :, ::-1].transpose(2, 0, 1) / 255.0
+            metas.append((scale, pad, image.shape[:2]))
+        return batch, metas
+
+    def postprocess(self, prediction, meta):
+        scale, (left, top), (h, w) = meta
+        prediction = prediction.T  # N×(4+类别数)
+        scores = prediction[:, 4:]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), classes]
+        keep = confidences >= self.conf
+        prediction, classes, confidences = prediction[keep], classes[keep], confidences[keep]
+        if not len(prediction):
+            return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64), None)
+
+        cx, cy, bw, bh = prediction[:, 0], prediction[:, 1], prediction[:, 2], prediction[:, 3]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - left) / scale).clip(0, w)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - top) / scale).clip(0, h)
+
+        xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confidences.tolist(), classes.tolist(), self.conf, self.iou)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        indices = indices[np.argsort(-confidences[indices])]
+        return Detections(boxes[indices].astype(np.float32), confidences[indices].astype(np.float32),
+                          classes[indices].astype(np.int64), None)
+
+    def __call__(self, images, **kwargs):
+        """对 BGR 图像列表做批量检测，返回 [Detections]。"""
+        if not images:
+            return []
+        batch, metas = self.preprocess(images)
+        outputs = []
+        # 导出的模型为固定批大小 1，逐张推理
+        for i, meta in enumerate(metas):
+            prediction = self.session.run(None, {self.input_name: batch[i:i + 1]})[0][0]
+            outputs.append(self.postprocess(prediction, meta))
+        return outputs
+
+
+def load_backend(model_path, threads=None):
+    """按模型文件类型选择检测后端。"""
+    if model_path.endswith(".onnx"):
+        return OnnxBackend(model_path, threads=threads)
+    return UltralyticsBackend(model_path)
+
+
+def export_onnx(model_path, imgsz=640):
+    """将 .pt 权重导出为 ONNX，返回导出的文件路径。"""
+    from ultralytics import YOLO
+    return YOLO(model_path, task='detect').export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+
+
+class _CalibrationReader:
+    # INT8 量化校准数据读取器，与 OnnxBackend 使用相同的预处理
+    def __init__(self, image_paths, input_name, imgsz):
+        self.image_paths = iter(image_paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self):
+        for path in self.image_paths:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            padded, _, _ = letterbox(image, self.imgsz)
+            tensor = padded[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: tensor}
+        return None
+
+
+def quantize_int8(onnx_path, calib_dir, output_path=None, samples=200, imgsz=640, seed=0):
+    """
+    用验证集图片做静态 INT8 量化校准
+    :param calib_dir: 校准图片目录（如 CCPD val 划分）
+    :param samples: 参与校准的图片数
+    :return: 量化后的模型路径
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    output_path = output_path or onnx_path.replace(".onnx", "_int8.onnx")
+    paths = sorted(glob.glob(os.path.join(calib_dir, "*.jpg")) + glob.glob(os.path.join(calib_dir, "*.png")))
+    random.Random(seed).shuffle(paths)
+    paths = paths[:samples]
+    if not paths:
+        raise ValueError(f"校准目录中没有图片: {calib_dir}")
+
+    prepared = onnx_path.replace(".onnx", "_prep.onnx")
+    quant_pre_process(onnx_path, prepared)
+    input_name = ort.InferenceSession(prepared, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    logger.info("使用 %d 张图片校准 INT8 量化", len(paths))
+    quantize_static(prepared, output_path, _CalibrationReader(paths, input_name, imgsz),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8, per_channel=True,
+                    calibrate_method=CalibrationMethod.MinMax)
+    os.remove(prepared)
+    return output_path
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="检测模型导出与量化")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="导出 ONNX，可选 INT8 量化")
+    export.add_argument("--model", default='runs/detect/train5/weights/best.pt', help=".pt 权重路径")
+    export.add_argument("--imgsz", type=int, default=640)
+    export.add_argument("--int8", action="store_true", help="导出后做静态 INT8 量化")
+    export.add_argument("--calib", help="校准图片目录，如 dataset/val/images")
+    export.add_argument("--samples", type=int, default=200, help="校准图片数")
+    args = parser.parse_args()
+
+    onnx_path = export_onnx(args.model, args.imgsz)
+    logger.info("已导出: %s", onnx_path)
+    if args.int8:
+        if not args.calib:
+            parser.error("INT8 量化需要 --calib 指定校准图片目录")
+        int8_path = quantize_int8(onnx_path, args.calib, samples=args.samples, imgsz=args.imgsz)
+        logger.info("已量化: %s", int8_path)
+
+
+if __name__ == "__main__":
+    main()
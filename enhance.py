@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+图像增强算子与预览流水线
+
+界面只需要显示尺寸的图像：预览在图像金字塔中与显示尺寸最接近的一层上运行，
+保存或识别时才在原分辨率上执行同一组算子。算子链的中间结果按前缀缓存，
+切换增强方法或在已有结果上叠加新算子时不必从原图重新计算。
+"""
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+ENHANCE_METHODS = [
+    "直方图均衡化",
+    "锐化",
+    "高斯模糊",
+    "边缘增强",
+    "降噪",
+    "膨胀",
+    "腐蚀"
+]
+
+SHARPEN_KERNEL = np.array([[0, -1, 0],
+                           [-1, 5, -1],
+                           [0, -1, 0]])
+
+
+def _odd(size, minimum=1):
+    # 按比例缩放后的核尺寸取奇数
+    size = max(int(round(size)), minimum)
+    return size if size % 2 else size + 1
+
+
+def _gray(img):
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+def apply_enhancement(img, method, scale=1.0):
+    """
+    对图像应用一种增强方法，返回新图像（可能为灰度图）；未知方法抛出 ValueError
+    :param img: BGR 或灰度图像
+    :param method: ENHANCE_METHODS 中的一种
+    :param scale: 图像相对原图的缩放比例，核尺寸随之缩小，使预览效果与原分辨率结果一致
+    """
+    if method == "直方图均衡化":
+        return cv2.equalizeHist(_gray(img))
+
+    elif method == "锐化":
+        return cv2.filter2D(img, -1, SHARPEN_KERNEL)
+
+    elif method == "高斯模糊":
+        ksize = _odd(7 * scale)
+        return cv2.GaussianBlur(img, (ksize, ksize), 0) if ksize > 1 else img.copy()
+
+    elif method == "边缘增强":
+        return cv2.Canny(_gray(img), 100, 200)
+
+    elif method == "降噪":
+        template, search = _odd(7 * scale, 3), _odd(21 * scale, 5)
+        if img.ndim == 2:
+            return cv2.fastNlMeansDenoising(img, None, 10, template, search)
+        return cv2.fastNlMeansDenoisingColored(img, None, 10, 10, template, search)
+
+    elif method in ("腐蚀", "膨胀"):
+        ksize = _odd(5 * scale, 3)
+        kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (ksize, ksize))
+        return cv2.erode(img, kernel) if method == "腐蚀" else cv2.dilate(img, kernel)
+
+    raise ValueError(f"未知的增强类型: {method}")
+
+
+class EnhancePipeline:
+    def __init__(self, image, max_cached=32):
+        """
+        :param image: 原分辨率 BGR 图像
+        :param max_cached: 缓存的中间结果数量上限（各金字塔层共用）
+        """
+        self.image = image
+        self.levels = [image]  # 图像金字塔，按需用 pyrDown 逐层生成
+        self.max_cached = max_cached
+        self._cache = OrderedDict()  # (层号, 算子链): 图像
+        self._lock = threading.Lock()
+
+    def level_for(self, size):
+        """返回按比例缩放到显示区域 (宽, 高) 后仍不需要放大的最小金字塔层号。"""
+        h0, w0 = self.image.shape[:2]
+        fit = min(size[0] / w0, size[1] / h0)
+        width, height = max(w0 * fit, 1), max(h0 * fit, 1)
+        level = 0
+        with self._lock:
+            while True:
+                h, w = self.levels[level].shape[:2]
+                # 已缩小到最小尺寸（显示区域折叠为 0 或几个像素时）不再继续生成更小的层
+                if (w + 1) // 2 < width or (h + 1) // 2 < height or min(w, h) <= 1:
+                    return level
+                if level + 1 == len(self.levels):
+                    self.levels.append(cv2.pyrDown(self.levels[level]))
+                level += 1
+
+    def render(self, chain, level=0):
+        """
+        在指定金字塔层上依次执行算子链，中间结果按前缀缓存
+        :param chain: 增强方法序列
+        :param level: 金字塔层号，0 为原分辨率
+        :return: 增强后的图像；返回的是缓存中的对象，调用方不要原地修改
+        """
+        chain = tuple(chain)
+        base = self.levels[level]
+        scale = base.shape[1] / self.image.shape[1]
+
+        done, img = 0, base
+        with self._lock:
+            for n in range(len(chain), 0, -1):
+                cached = self._cache.get((level, chain[:n]))
+                if cached is not None:
+                    self._cache.move_to_end((level, chain[:n]))
+                    done, img = n, cached
+                    break
+
+        for n in range(done + 1, len(chain) + 1):
+            img = apply_enhancement(img, chain[n - 1], scale)
+            with self._lock:
+                self._cache[(level, chain[:n])] = img
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        return img
+
+    def preview(self, chain, size):
+        """在与显示尺寸 (宽, 高) 匹配的金字塔层上预览算子链。"""
+        return self.render(chain, self.level_for(size))
+
+    def full(self, chain):
+        """原分辨率结果，用于保存与识别。"""
+        return self.render(chain, 0)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+停车场入场 / 出场事件的追加日志：组提交（多条事件共用一次 fsync），定期写出在场车辆快照，
+重启时读取最新快照并只重放快照之后的日志
+
+目录结构：
+    events-<首条序号>.log   日志分段，每行一条事件，制表符分隔
+    snapshot-<序号>.json    该序号时刻的在场车辆 {车牌号: 入场时间}
+
+日志行格式：
+    E  序号  车牌号  入场时间
+    X  序号  车牌号  入场时间  出场时间
+    S  序号  车牌号  入场时间  出场时间  费用
+出场事件不含费用，闸口放行不必等待计费；结算完成后再追加一条结算事件记录费用，结算事件不影响在场车辆
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _segment_path(directory, first_seq):
+    return os.path.join(directory, f"events-{first_seq:012d}.log")
+
+
+def _snapshot_path(directory, seq):
+    return os.path.join(directory, f"snapshot-{seq:012d}.json")
+
+
+def _seq_of(path):
+    return int(os.path.basename(path).split("-")[1].split(".")[0])
+
+
+def _fsync_dir(directory):
+    # 让新建 / 重命名的文件在目录项层面也落盘（Windows 不支持打开目录）
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class EventLog:
+    def __init__(self, directory="parking_events", commit_delay=0.0, max_batch=1024,
+                 snapshot_every=10000, segment_bytes=64 * 1024 * 1024, keep_snapshots=2):
+        """
+        :param directory: 日志目录
+        :param commit_delay: 写线程收到第一条事件后再等待多久凑批（秒），0 表示只合并 fsync 期间到达的事件
+        :param max_batch: 单次 fsync 最多提交的事件数，1 相当于逐条 fsync
+        :param snapshot_every: 每追加多少条事件写一次快照
+        :param segment_bytes: 日志分段大小上限
+        :param keep_snapshots: 保留的快照个数
+        """
+        self.directory = directory
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        self.snapshot_every = snapshot_every
+        self.segment_bytes = segment_bytes
+        self.keep_snapshots = keep_snapshots
+        os.makedirs(directory, exist_ok=True)
+
+        self.active = {}      # 车牌号: 入场时间，与日志保持一致
+        self.seq = 0          # 最后分配的序号
+        self.durable_seq = 0  # 已 fsync 的最大序号
+        self.stats = {"events": 0, "fsyncs": 0, "snapshots": 0, "replayed": 0, "recovery_seconds": 0.0}
+        self._recover()
+
+        self._buffer = []          # 待写入的日志行，按序号排列
+        self._snapshot = None      # 待写出的 (序号, 在场车辆副本)
+        self._since_snapshot = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)   # 通知写线程
+        self._durable = threading.Condition(self._lock)  # 通知等待落盘的调用方
+        self._closed = False
+        self._error = None         # 写线程遇到的异常
+        self._open_segment(self.seq + 1)
+        self._writer = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._writer.start()
+
+    # ---------- 恢复 ----------
+
+    def _recover(self):
+        start = time.perf_counter()
+        snapshots = sorted(glob.glob(os.path.join(self.directory, "snapshot-*.json")), key=_seq_of)
+        snapshot_seq = 0
+        for path in reversed(snapshots):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                snapshot_seq, self.active = data["seq"], data["active"]
+                break
+            except (OSError, ValueError, KeyError):
+                logger.warning("快照 %s 损坏，尝试更早的快照", path)
+        self.seq = snapshot_seq
+
+        # 只读取包含快照之后事件的分段：最后一个首条序号不大于 snapshot_seq + 1 的分段及其后所有分段
+        segments = sorted(glob.glob(os.path.join(self.directory, "events-*.log")), key=_seq_of)
+        first = 0
+        for i, path in enumerate(segments):
+            if _seq_of(path) <= snapshot_seq + 1:
+                first = i
+        replayed = 0
+        for path in segments[first:]:
+            replayed += self._replay(path, snapshot_seq)
+        self.durable_seq = self.seq
+        self.stats["replayed"] = replayed
+        self.stats["recovery_seconds"] = time.perf_counter() - start
+        logger.info("事件日志恢复完成：快照序号 %d，重放 %d 条，在场 %d 辆，用时 %.3f 秒",
+                    snapshot_seq, replayed, len(self.active), self.stats["recovery_seconds"])
+
+    def _replay(self, path, after_seq):
+        active = self.active
+        replayed = valid = 0
+        with open(path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 崩溃时写了一半的最后一行
+                valid += len(raw)
+                fields = raw.decode("utf-8").rstrip("\n").split("\t")
+                seq = int(fields[1])
+                if seq <= after_seq:
+                    continue
+                if fields[0] == "E":
+                    active[fields[2]] = float(fields[3])
+                elif fields[0] == "X":
+                    active.pop(fields[2], None)
+                self.seq = seq
+                replayed += 1
+        if valid < os.path.getsize(path):
+            logger.warning("截掉 %s 末尾不完整的事件", path)
+            os.truncate(path, valid)
+        return replayed
+
+    # ---------- 写入 ----------
+
+    def _open_segment(self, first_seq):
+        path = _segment_path(self.directory, first_seq)
+        self._file = open(path, "ab")
+        _fsync_dir(self.directory)
+
+    def _append(self, kind, payload, apply, wait):
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if self._closed:
+                raise RuntimeError("事件日志已关闭")
+            self.seq += 1
+            seq = self.seq
+            apply()
+            self._buffer.append(f"{kind}\t{seq}\t{payload}\n")
+            self.stats["events"] += 1
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_every:
+                self._snapshot = (seq, dict(self.active))
+                self._since_snapshot = 0
+            self._wakeup.notify()
+            if wait:
+                self._wait_durable(seq)
+        return seq
+
+    def append_enter(self, plate, enter_time, wait=True):
+        """
+        记录入场
+        :param wait: 是否等到事件 fsync 落盘后再返回
+        :return: 事件序号
+        """
+        def apply():
+            self.active[plate] = enter_time
+        return self._append("E", f"{plate}\t{enter_time!r}", apply, wait)
+
+    def append_exit(self, plate, enter_time, exit_time, wait=True):
+        """记录出场，返回事件序号。"""
+        def apply():
+            self.active.pop(plate, None)
+        return self._append("X", f"{plate}\t{enter_time!r}\t{exit_time!r}", apply, wait)
+
+    def append_settle(self, plate, enter_time, exit_time, fee, wait=True):
+        """记录一次停车的结算费用，返回事件序号。"""
+        return self._append("S", f"{plate}\t{enter_time!r}\t{exit_time!r}\t{fee!r}", lambda: None, wait)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._buffer and not self._closed:
+                    self._wakeup.wait()
+                if not self._buffer and self._closed:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            try:
+                self._commit()
+            except Exception as e:
+                # 磁盘写满、EIO 等：记录错误并唤醒所有等待方，之后的追加与 flush 直接抛出该异常
+                logger.exception("事件日志写入失败，停止记录")
+                with self._lock:
+                    self._error = e
+                    self._durable.notify_all()
+                return
+
+    def _commit(self):
+        with self._lock:
+            lines = self._buffer[:self.max_batch]
+            del self._buffer[:len(lines)]
+            last_seq = self.durable_seq + len(lines)
+            snapshot = self._snapshot if self._snapshot and self._snapshot[0] <= last_seq else None
+            if snapshot is not None:
+                self._snapshot = None
+
+        # 写文件与 fsync 不持有锁，期间到达的事件会进入下一批
+        self._file.write("".join(lines).encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        with self._lock:
+            self.durable_seq = last_seq
+            self.stats["fsyncs"] += 1
+            self._durable.notify_all()
+
+        if snapshot is not None:
+            self._write_snapshot(*snapshot)
+        if self._file.tell() >= self.segment_bytes:
+            self._file.close()
+            self._open_segment(last_seq + 1)
+
+    def _wait_durable(self, seq):
+        # 调用方需持有 self._lock
+        while self.durable_seq < seq:
+            if self._error is not None:
+                raise self._error
+            self._durable.wait()
+
+    def _write_snapshot(self, seq, active):
+        path = _snapshot_path(self.directory, seq)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "active": active}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.directory)
+        self.stats["snapshots"] += 1
+        snapshots = sorted(glob.glob(os.path.join(self.directory, "snapshot-*.json")), key=_seq_of)
+        for old in snapshots[:-self.keep_snapshots]:
+            os.remove(old)
+
+    def flush(self):
+        """等待已追加的事件全部落盘；写线程出错时抛出其异常。"""
+        with self._lock:
+            self._wait_durable(self.seq)
+
+    def close(self, snapshot=True):
+        """
+        落盘所有事件并停止写线程
+        :param snapshot: 关闭前写一次快照，下次启动时无需重放
+        写线程出错时仍会停止线程并关闭文件，然后抛出该异常（不写快照，下次启动时从日志恢复）
+        """
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._wait_durable(self.seq)
+            except Exception:
+                pass  # 错误已记录在 self._error，先完成清理再抛出
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join()
+        try:
+            self._file.close()
+        except OSError:
+            if self._error is None:
+                raise
+        if self._error is not None:
+            raise self._error
+        if snapshot:
+            self._write_snapshot(self.seq, dict(self.active))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+容忍 OCR 误识别的在场车牌近似匹配索引
+
+采用删除变体索引（SymSpell 思路）：每个车牌删除至多 max_edits 个字符后的所有变体都指向该车牌，
+查询时同样生成变体取候选，再用按 OCR 易混淆字符加权的编辑距离精确打分。
+候选集合很小，即使场内有数万辆车，单次查询也在亚毫秒级
+"""
+import threading
+from itertools import combinations
+
+# OCR 常见混淆字符对，替换代价低于普通替换
+CONFUSION_PAIRS = [
+    ("0", "D"), ("0", "Q"), ("D", "Q"), ("8", "B"), ("1", "7"), ("1", "T"),
+    ("2", "Z"), ("5", "S"), ("6", "G"), ("4", "A"), ("U", "V"), ("M", "N"),
+]
+CONFUSION_COST = 0.3
+
+
+def build_substitution_costs(pairs=CONFUSION_PAIRS, cost=CONFUSION_COST):
+    costs = {}
+    for a, b in pairs:
+        costs[(a, b)] = costs[(b, a)] = cost
+    return costs
+
+
+SUBSTITUTION_COSTS = build_substitution_costs()
+
+
+def weighted_edit_distance(a, b, substitution_costs=SUBSTITUTION_COSTS):
+    # 插入、删除代价为 1，替换代价查混淆表，默认为 1
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [float(i)]
+        for j, cb in enumerate(b, 1):
+            sub = 0.0 if ca == cb else substitution_costs.get((ca, cb), 1.0)
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + sub))
+        previous = current
+    return previous[-1]
+
+
+def deletion_variants(text, max_edits):
+    # 删除至多 max_edits 个字符得到的所有变体（含原串）
+    variants = {text}
+    for n in range(1, min(max_edits, len(text)) + 1):
+        for positions in combinations(range(len(text)), n):
+            variants.add("".join(c for i, c in enumerate(text) if i not in positions))
+    return variants
+
+
+class FuzzyPlateIndex:
+    def __init__(self, max_edits=2, max_distance=0.7, confidence_weight=0.6):
+        """
+        :param max_edits: 允许的最大字符编辑次数（决定索引规模，1 或 2）
+        :param max_distance: 接受匹配的最大加权编辑距离，默认只接受至多两处易混淆字符的替换
+        :param confidence_weight: 识别置信度对容忍度的影响，置信度越高容忍度越低
+        """
+        self.max_edits = max_edits
+        self.max_distance = max_distance
+        self.confidence_weight = confidence_weight
+        self._variants = {}  # 删除变体: {车牌号}
+        self._plates = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._plates)
+
+    def __contains__(self, plate):
+        return plate in self._plates
+
+    def add(self, plate):
+        with self._lock:
+            if plate in self._plates:
+                return
+            self._plates.add(plate)
+            for variant in deletion_variants(plate, self.max_edits):
+                self._variants.setdefault(variant, set()).add(plate)
+
+    def remove(self, plate):
+        with self._lock:
+            if plate not in self._plates:
+                return
+            self._plates.discard(plate)
+            for variant in deletion_variants(plate, self.max_edits):
+                bucket = self._variants.get(variant)
+                if bucket is not None:
+                    bucket.discard(plate)
+                    if not bucket:
+                        del self._variants[variant]
+
+    def allowed_distance(self, confidence=None):
+        """根据识别置信度计算本次查询允许的最大距离。"""
+        if confidence is None:
+            return self.max_distance
+        confidence = min(max(float(confidence), 0.0), 1.0)
+        return self.max_distance * (1.0 - self.confidence_weight * confidence)
+
+    def match(self, text, confidence=None):
+        """
+        查找与 text 最接近的在场车牌
+        :param confidence: OCR 置信度，为 None 时使用 max_distance
+        :return: (车牌号, 加权距离)，没有足够接近或存在并列最优候选时返回 (None, None)
+        """
+        if not text:
+            return None, None
+        with self._lock:
+            if text in self._plates:
+                return text, 0.0
+            candidates = set()
+            for variant in deletion_variants(text, self.max_edits):
+                candidates.update(self._variants.get(variant, ()))
+
+        limit = self.allowed_distance(confidence)
+        best, best_distance, tie = None, None, False
+        for plate in candidates:
+            distance = weighted_edit_distance(text, plate)
+            if distance > limit:
+                continue
+            if best_distance is None or distance < best_distance:
+                best, best_distance, tie = plate, distance, False
+            elif distance == best_distance:
+                tie = True
+        if best is None or tie:
+            return None, None
+        return best, best_distance
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+多车道并发闸口服务：线程池接收各车道事件，同一车牌的事件由分片锁串行处理，
+费用计算与历史写入放到单独的线程池中完成，不占用闸口放行的关键路径；
+同一车道对同一车牌的重复触发在提交时即被丢弃（见 dedup.RecentPlates）
+"""
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+GateEvent = namedtuple("GateEvent", ["lane", "plate", "kind", "timestamp", "confidence"], defaults=[None])
+GateResult = namedtuple("GateResult", ["event", "ok", "message", "fee"])  # 出场时 fee 为 Future
+
+
+class GateService:
+    def __init__(self, parking_lot, workers=8, shards=64, fee_workers=2, recent_plates=None):
+        """
+        :param parking_lot: parking.ParkingLot
+        :param workers: 处理闸口事件的线程数
+        :param shards: 车牌锁分片数
+        :param fee_workers: 计费线程数
+        :param recent_plates: dedup.RecentPlates，同一车道同一车牌在时间窗口内的重复事件直接丢弃；None 表示不去重
+        """
+        self.parking_lot = parking_lot
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="gate")
+        self._fee_executor = ThreadPoolExecutor(fee_workers, thread_name_prefix="fee")
+        self._stats_lock = threading.Lock()
+        self.recent_plates = recent_plates
+        self.stats = {"enter": 0, "exit": 0, "rejected": 0, "debounced": 0}
+
+    def _lock_for(self, plate):
+        # 用稳定的哈希分片，同一车牌总是落在同一把锁上
+        return self._locks[zlib.crc32(plate.encode("utf-8")) % len(self._locks)]
+
+    def submit(self, lane, plate, kind, timestamp=None, confidence=None):
+        """
+        异步提交一条闸口事件
+        :param kind: "enter" 或 "exit"
+        :param confidence: 车牌识别置信度，出场时用于近似匹配
+        :return: Future，结果为 GateResult
+        """
+        event = GateEvent(lane, plate, kind, time.time() if timestamp is None else timestamp, confidence)
+        if self.recent_plates is not None and not self.recent_plates.check((lane, kind), plate, event.timestamp):
+            # 重复触发不进入线程池，也不触碰车牌锁和停车场状态
+            with self._stats_lock:
+                self.stats["debounced"] += 1
+            future = Future()
+            future.set_result(GateResult(event, False, f"车辆 {plate} 重复触发，已忽略。", None))
+            return future
+        future = self._executor.submit(self.process, event)
+        if self.recent_plates is not None:
+            # 处理出错时撤销去重登记，允许立即重试
+            future.add_done_callback(
+                lambda f: f.exception() is not None and self.recent_plates.forget((lane, kind), plate))
+        return future
+
+    def process(self, event):
+        """同步处理一条闸口事件，返回 GateResult。"""
+        if event.kind not in ("enter", "exit"):
+            raise ValueError(f"未知的事件类型: {event.kind}")
+        lot = self.parking_lot
+        plate = event.plate
+        if event.kind == "exit":
+            # 先做近似匹配，再锁住实际在场车牌所在的分片
+            plate = lot.match_plate(plate, event.confidence) or plate
+        with self._lock_for(plate):
+            if event.kind == "enter":
+                stay = lot.check_in(plate, event.timestamp)
+            else:
+                stay = lot.check_out(plate, event.timestamp, event.confidence)
+
+        with self._stats_lock:
+            self.stats[event.kind if stay is not None else "rejected"] += 1
+
+        if event.kind == "enter":
+            if stay is None:
+                return GateResult(event, False, f"车辆 {event.plate} 已在场内。", None)
+            return GateResult(event, True, f"车辆 {event.plate} 入场成功。", None)
+
+        if stay is None:
+            return GateResult(event, False, f"车辆 {event.plate} 不在场内。", None)
+        plate, enter_time, exit_time = stay
+        fee = self._fee_executor.submit(lot.settle, plate, enter_time, exit_time)
+        return GateResult(event, True, f"车辆 {plate} 出场，停车时长 "
+                                       f"{(exit_time - enter_time) / 3600:.2f} 小时。", fee)
+
+    def shutdown(self, wait=True):
+        """停止接收事件，并等待已提交的事件与计费完成。"""
+        self._executor.shutdown(wait=wait)
+        self._fee_executor.shutdown(wait=wait)
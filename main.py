@@ -2,26 +2,35 @@
 import sys
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout,
-    QHBoxLayout, QFileDialog, QMessageBox, QSizePolicy, QComboBox
+    QHBoxLayout, QFileDialog, QMessageBox, QSizePolicy, QComboBox, QCheckBox
 )
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt
-from fontTools.ttx import process
-from paddleocr import TextRecognition
-from ultralytics import YOLO
 from PTL import *
-
+from enhance import ENHANCE_METHODS, EnhancePipeline
+from models import warmup
+from qt_workers import TaskRunner
+from recognizer import PlateRecognizer, draw_detections
+from result_cache import RecognitionCache
 
 class ImageEnhancer(QWidget):
-    def __init__(self):
+    def __init__(self, recognizer=None):
         super().__init__()
         self.resize(1600, 1000)
         self.original_cv = None
         self.processed_cv = None
         self.original_pixmap = None
         self.processed_pixmap = None
-        self.model = YOLO('runs/detect/train5/weights/best.pt')
-        self.ocr = TextRecognition(model_name="PP-OCRv5_server_rec")
+        self.enhancer = None       # 当前图片的 EnhancePipeline
+        self.chain = ()            # 已应用的增强算子链，识别与保存时按原分辨率执行
+        self.processed_chain = None  # 右侧显示的预览对应的算子链，显示识别结果时为 None
+        self.recognizer = recognizer or PlateRecognizer(cache=RecognitionCache())
+        self.image_queue = []      # 待处理的图片路径
+        self.queue_index = -1
+        self.queue_results = {}    # 图片路径: (RecognitionResult, 识别所用的原分辨率增强图，未增强时为 None)
+        self.annotate_buffer = None  # 复用的标注画布，避免每次显示识别结果都分配整帧内存
+        self.enhance_runner = TaskRunner()
+        self.detect_runner = TaskRunner(max_threads=1)  # 模型推理不是线程安全的，串行执行
         self.init_ui()
 
     def init_ui(self):
@@ -33,15 +42,10 @@ class ImageEnhancer(QWidget):
             label.setScaledContents(False)  # 禁止自动拉伸，保持长宽比
 
         self.combo_enhance = QComboBox()
-        self.combo_enhance.addItems([
-            "直方图均衡化",
-            "锐化",
-            "高斯模糊",
-            "边缘增强",
-            "降噪",
-            "膨胀",
-            "腐蚀"
-        ])
+        self.combo_enhance.addItems(ENHANCE_METHODS)
+        self.combo_enhance.currentTextChanged.connect(self.preview_enhancement)
+        self.check_chain = QCheckBox("叠加")
+        self.check_chain.setToolTip("在已应用的增强结果上继续叠加")
 
         self.btn_open = QPushButton("打开图像")
         self.btn_open.clicked.connect(self.open_image)
@@ -51,6 +55,10 @@ class ImageEnhancer(QWidget):
         self.btn_save.clicked.connect(self.save_image)
         self.btn_detect = QPushButton("识别车牌")
         self.btn_detect.clicked.connect(self.detect_image)
+        self.btn_detect_all = QPushButton("批量识别")
+        self.btn_detect_all.clicked.connect(self.detect_queue)
+        self.btn_next = QPushButton("下一张")
+        self.btn_next.clicked.connect(self.next_image)
         self.label_text = QLabel("识别结果：")
         self.label_text.setAlignment(Qt.AlignCenter)
 
@@ -63,8 +71,11 @@ class ImageEnhancer(QWidget):
         layout_controls = QHBoxLayout()
         layout_controls.addWidget(self.btn_open)
         layout_controls.addWidget(self.combo_enhance)
+        layout_controls.addWidget(self.check_chain)
         layout_controls.addWidget(self.btn_enhance)
         layout_controls.addWidget(self.btn_detect)
+        layout_controls.addWidget(self.btn_detect_all)
+        layout_controls.addWidget(self.btn_next)
         layout_controls.addWidget(self.btn_save)
 
         layout_main.addLayout(layout_imgs)
@@ -74,59 +85,69 @@ class ImageEnhancer(QWidget):
         self.setWindowTitle("图像增强工具")
 
     def open_image(self):
-        path, _ = QFileDialog.getOpenFileName(self, "打开图片", "", "Images (*.png *.jpg *.bmp)")
-        if path:
-            self.original_cv = cv2.imread(path)
-            self.update_pixmaps()
-            self.update_display()
+        paths, _ = QFileDialog.getOpenFileNames(self, "打开图片", "", "Images (*.png *.jpg *.bmp)")
+        if paths:
+            self.image_queue = paths
+            self.queue_results = {}
+            self.queue_index = 0
+            self.load_current()
+
+    def next_image(self):
+        if self.queue_index + 1 >= len(self.image_queue):
+            QMessageBox.information(self, "提示", "已经是最后一张图片")
+            return
+        self.queue_index += 1
+        self.load_current()
+
+    def current_path(self):
+        if 0 <= self.queue_index < len(self.image_queue):
+            return self.image_queue[self.queue_index]
+        return None
+
+    def load_current(self):
+        # 切换图片时，针对上一张图片的增强与识别结果已经过期
+        self.enhance_runner.cancel_key("enhance")
+        self.detect_runner.cancel_key("detect")
+        path = self.current_path()
+        self.original_cv = cv2.imread(path)
+        self.enhancer = EnhancePipeline(self.original_cv) if self.original_cv is not None else None
+        self.chain = ()
+        self.processed_chain = None
+        self.processed_cv = None
+        self.processed_pixmap = None
+        self.label_result.clear()
+        if path in self.queue_results:
+            self.show_detection(path, *self.queue_results[path])
+        else:
+            self.label_text.setText(f"识别结果：（{self.queue_index + 1}/{len(self.image_queue)}）")
+        self.update_pixmaps()
+        self.update_display()
+
+    def candidate_chain(self):
+        method = self.combo_enhance.currentText()
+        return self.chain + (method,) if self.check_chain.isChecked() else (method,)
+
+    def preview_enhancement(self):
+        # 在显示尺寸的金字塔层上预览，切换方法时无需等待原分辨率计算
+        if self.enhancer is None:
+            return
+        chain = self.candidate_chain()
+        size = (self.label_result.width(), self.label_result.height())
+        self.enhance_runner.submit(self.enhancer.preview, chain, size, key="enhance",
+                                   on_finished=lambda task_id, result: self.on_enhanced(chain, result),
+                                   on_failed=self.on_task_failed)
 
     def enhance_image(self):
         if self.original_cv is None:
             QMessageBox.warning(self, "提示", "请先打开图片")
             return
 
-        method = self.combo_enhance.currentText()
-        img = self.original_cv.copy()
-
-        if method == "直方图均衡化":
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            enhanced = cv2.equalizeHist(gray)
-            self.processed_cv = enhanced
-
-        elif method == "锐化":
-            kernel = np.array([[0, -1, 0],
-                               [-1, 5, -1],
-                               [0, -1, 0]])
-            sharpened = cv2.filter2D(img, -1, kernel)
-            self.processed_cv = sharpened
-
-        elif method == "高斯模糊":
-            blurred = cv2.GaussianBlur(img, (7, 7), 0)
-            self.processed_cv = blurred
-
-        elif method == "边缘增强":
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 100, 200)
-            self.processed_cv = edges
-
-        elif method == "降噪":
-            denoised = cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
-            self.processed_cv = denoised
-
-        elif method == "腐蚀":
-            kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (5, 5))
-            erosion = cv2.erode(img, kernel)
-            self.processed_cv = erosion
-
-        elif method == "膨胀":
-            kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (5, 5))
-            dilation = cv2.dilate(img, kernel)
-            self.processed_cv = dilation
-
-        else:
-            QMessageBox.warning(self, "提示", "未知的增强类型")
-            return
+        self.chain = self.candidate_chain()
+        self.preview_enhancement()
 
+    def on_enhanced(self, chain, result):
+        self.processed_cv = result
+        self.processed_chain = chain
         self.update_pixmaps()
         self.update_display()
 
@@ -135,37 +156,93 @@ class ImageEnhancer(QWidget):
             QMessageBox.warning(self, "提示", "请先打开图片")
             return
 
-        image = self.original_cv.copy()
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.model(image_rgb)
-        annotated_frame = results[0].plot()
-
-        plate_texts = []
-        for box in results[0].boxes.xyxy:
-            if hasattr(box, 'cpu'):
-                box = box.cpu().numpy()
-            plate = plate_recognize(image, box, self.ocr)
-            ALLOWED_CHARS = set(
-                "京津沪渝冀晋辽吉黑苏浙皖闽赣鲁豫鄂湘粤琼川贵云陕甘青蒙桂宁新藏"
-                "ABCDEFGHJKLMNPQRSTUVWXYZ0123456789"
-            )
-            processed_text = "".join([c for c in plate if c in ALLOWED_CHARS])
-            plate_texts.append(processed_text)
+        path = self.current_path()
+        self.label_text.setText("识别结果：识别中…")
+        self.detect_runner.submit(self.recognize_enhanced, self.enhancer, self.chain, key="detect", priority=1,
+                                  on_finished=lambda task_id, output: self.on_detected(path, *output),
+                                  on_failed=self.on_task_failed)
+
+    def recognize_enhanced(self, enhancer, chain):
+        # 在工作线程中执行：按原分辨率应用增强算子链后识别，同时返回增强图供界面线程直接绘制检测框
+        if not chain:
+            return self.recognizer.recognize(enhancer.image), None
+        image = enhancer.full(chain)
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return self.recognizer.recognize(image), image
+
+    def detect_queue(self):
+        if not self.image_queue:
+            QMessageBox.warning(self, "提示", "请先打开图片")
+            return
+        for path in self.image_queue:
+            if path in self.queue_results:
+                continue
+            self.detect_runner.submit(self.recognize_path, path,
+                                      on_finished=lambda task_id, result, p=path: self.on_detected(p, result),
+                                      on_failed=self.on_task_failed)
+        self.update_progress()
+
+    def recognize_path(self, path):
+        # 在工作线程中执行：读取并识别一张图片
+        return self.recognizer.recognize_file(path)
+
+    def on_detected(self, path, result, base=None):
+        self.queue_results[path] = (result, base)
+        if path == self.current_path():
+            self.show_detection(path, result, base)
+            self.update_pixmaps()
+            self.update_display()
+        self.update_progress()
+
+    def show_detection(self, path, result, base=None):
+        self.label_text.setText("识别结果：" + " | ".join(result.texts))
+        self.processed_cv = self.render_detection(result, base)
+        self.processed_chain = None
+
+    def render_detection(self, result, base=None):
+        # 把检测框画在复用的画布上：识别时不生成标注图，显示时只做一次整帧拷贝；
+        # 增强图由识别任务在工作线程中生成，界面线程不做原分辨率增强
+        base = self.original_cv if base is None else base
+        shape = base.shape[:2] + (3,)
+        if self.annotate_buffer is None or self.annotate_buffer.shape != shape:
+            self.annotate_buffer = np.empty(shape, dtype=np.uint8)
+        if base.ndim == 2:
+            cv2.cvtColor(base, cv2.COLOR_GRAY2BGR, dst=self.annotate_buffer)
+            base = self.annotate_buffer
+        return draw_detections(base, result.boxes, result.confidences, result.classes, out=self.annotate_buffer)
+
+    def update_progress(self):
+        pending = self.detect_runner.pending()
+        if pending:
+            self.setWindowTitle(f"图像增强工具 - 识别中，剩余 {pending} 张")
+        else:
+            self.setWindowTitle("图像增强工具")
 
-        self.label_text.setText("识别结果：" + " | ".join(plate_texts))
-
-        self.processed_cv = cv2.cvtColor(annotated_frame, cv2.COLOR_RGB2BGR)
-        self.update_pixmaps()
-        self.update_display()
+    def on_task_failed(self, task_id, message):
+        self.update_progress()
+        QMessageBox.warning(self, "错误", message)
 
     def save_image(self):
         if self.processed_cv is None:
             QMessageBox.warning(self, "提示", "请先处理图片")
             return
         path, _ = QFileDialog.getSaveFileName(self, "保存图片", "", "PNG Files (*.png);;JPEG Files (*.jpg)")
-        if path:
-            cv2.imwrite(path, self.processed_cv)
+        if not path:
+            return
+        if self.processed_chain is None:
+            self.write_image(path, self.processed_cv)
+        else:
+            # 预览只是缩小后的结果，保存时按原分辨率重新执行算子链
+            self.enhance_runner.submit(self.enhancer.full, self.processed_chain, key="save",
+                                       on_finished=lambda task_id, result: self.write_image(path, result),
+                                       on_failed=self.on_task_failed)
+
+    def write_image(self, path, image):
+        if cv2.imwrite(path, image):
             QMessageBox.information(self, "成功", f"保存成功: {path}")
+        else:
+            QMessageBox.warning(self, "错误", f"保存失败: {path}")
 
     def update_pixmaps(self):
         if self.original_cv is not None:
@@ -190,16 +267,16 @@ class ImageEnhancer(QWidget):
         self.update_display()
 
     def cv2_to_pixmap(self, img, is_gray=False):
-        if is_gray:
-            qimg = QImage(img.data, img.shape[1], img.shape[0], img.strides[0], QImage.Format_Grayscale8)
-        else:
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            qimg = QImage(rgb_img.data, rgb_img.shape[1], rgb_img.shape[0], rgb_img.strides[0], QImage.Format_RGB888)
+        # QImage 直接引用 numpy 内存（BGR888 无需转换颜色），QPixmap.fromImage 时只拷贝一次
+        img = np.ascontiguousarray(img)
+        fmt = QImage.Format_Grayscale8 if is_gray else QImage.Format_BGR888
+        qimg = QImage(img.data, img.shape[1], img.shape[0], img.strides[0], fmt)
         return QPixmap.fromImage(qimg)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    warmup(background=True)
     window = ImageEnhancer()
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+识别流水线的分阶段耗时统计与性能剖析
+
+    with METRICS.timer("ocr"):
+        ...
+    print(METRICS.to_prometheus())
+
+各阶段耗时进入直方图（保留最近的样本计算 p50/p95/p99），可以输出 Prometheus 文本格式或 JSON，
+也可以注册自定义 sink 定期推送；单次请求可切换到 cProfile 或采样剖析模式
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+# 流水线的标准阶段名
+STAGES = ("request", "queue", "decode", "motion", "color", "detect", "crop", "preprocess", "corners", "warp", "ocr", "ocr_fast", "ocr_accurate", "postfilter", "total")
+
+
+class Histogram:
+    def __init__(self, window=10000):
+        """
+        :param window: 用于计算分位数的最近样本数
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.samples.append(value)
+            self.count += 1
+            self.sum += value
+
+    def percentiles(self, qs=(0.5, 0.95, 0.99)):
+        with self._lock:
+            data = sorted(self.samples)
+        if not data:
+            return {q: 0.0 for q in qs}
+        return {q: data[min(len(data) - 1, int(q * len(data)))] for q in qs}
+
+    def summary(self):
+        p = self.percentiles()
+        return {"count": self.count, "sum": self.sum, "p50": p[0.5], "p95": p[0.95], "p99": p[0.99]}
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "start", "elapsed")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        if self.registry.enabled:
+            self.registry.observe(self.stage, self.elapsed)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, window=10000, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self.histograms = {}
+        self.sinks = []
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        hist = self.histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(stage, Histogram(self.window))
+        return hist
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def timer(self, stage):
+        """计时上下文管理器，退出后 .elapsed 为耗时（秒）；registry 关闭时只计时不记录。"""
+        return _Timer(self, stage)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def snapshot(self):
+        """各阶段的 {count, sum, p50, p95, p99}，单位为秒。"""
+        return {stage: hist.summary() for stage, hist in sorted(self.histograms.items())}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, name="plate_pipeline_stage_seconds"):
+        """以 Prometheus 文本格式（summary 类型）输出。"""
+        lines = [f"# HELP {name} Latency of each plate recognition stage in seconds.",
+                 f"# TYPE {name} summary"]
+        for stage, s in self.snapshot().items():
+            for q in ("0.5", "0.95", "0.99"):
+                key = "p" + q[2:].ljust(2, "0")
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {s[key]:.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {s["sum"]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def add_sink(self, sink):
+        """注册 sink：任何带 emit(registry) 方法的对象。"""
+        self.sinks.append(sink)
+
+    def flush(self):
+        for sink in self.sinks:
+            try:
+                sink.emit(self)
+            except Exception:
+                logger.exception("指标输出失败")
+
+
+class JsonFileSink:
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, registry):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(registry.to_json())
+
+
+class PrometheusFileSink:
+    # 写入 node_exporter textfile collector 目录即可被 Prometheus 采集
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, registry):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(registry.to_prometheus())
+
+
+class LogSink:
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def emit(self, registry):
+        for stage, s in registry.snapshot().items():
+            logger.log(self.level, f"{stage}: n={s['count']} p50={s['p50'] * 1000:.2f}ms "
+                                   f"p95={s['p95'] * 1000:.2f}ms p99={s['p99'] * 1000:.2f}ms")
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.001, thread_id=None):
+        """
+        采样剖析：后台线程定期抓取目标线程的调用栈，统计各函数出现的次数
+        :param interval: 采样间隔（秒）
+        :param thread_id: 目标线程，默认为创建剖析器的线程
+        """
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.self_counts[self._key(frame)] += 1
+            seen = set()
+            while frame is not None:
+                key = self._key(frame)
+                if key not in seen:
+                    self.total_counts[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+
+    @staticmethod
+    def _key(frame):
+        code = frame.f_code
+        return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, top=25):
+        lines = [f"{self.samples} samples, interval {self.interval * 1000:.1f} ms",
+                 f"{'self%':>7}{'total%':>8}  function"]
+        n = max(self.samples, 1)
+        for key, total in self.total_counts.most_common(top):
+            lines.append(f"{self.self_counts[key] * 100 / n:7.1f}{total * 100 / n:8.1f}  {key}")
+        return "\n".join(lines)
+
+
+class profiled:
+    """
+    对一段代码做剖析，退出后 .report 为文本报告
+
+        with profiled("cprofile") as prof:
+            recognizer.recognize(image)
+        print(prof.report)
+
+    :param mode: "cprofile"（确定性，开销较大）或 "sampling"（低开销采样）；None 表示不剖析
+    """
+    def __init__(self, mode="cprofile", top=25):
+        if mode not in (None, "cprofile", "sampling"):
+            raise ValueError(f"未知的剖析模式: {mode}")
+        self.mode = mode
+        self.top = top
+        self.report = ""
+        self._profiler = None
+
+    def __enter__(self):
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.mode == "sampling":
+            self._profiler = SamplingProfiler()
+            self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.mode == "cprofile":
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(self.top)
+            self.report = out.getvalue()
+        elif self.mode == "sampling":
+            self._profiler.stop()
+            self.report = self._profiler.report(self.top)
+        return False
+
+
+# 进程内默认的指标注册表
+METRICS = MetricsRegistry()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+进程级模型注册表：模型在首次使用时才加载，同一进程内的所有调用方共享同一份实例
+"""
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = 'runs/detect/train5/weights/best.pt'
+DEFAULT_OCR_MODEL = "PP-OCRv5_server_rec"
+DEFAULT_FAST_OCR_MODEL = "PP-OCRv5_mobile_rec"  # 级联识别的快速模型，见 ocr_cascade
+
+_models = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_load(key, loader):
+    """按 key 取出已加载的模型，不存在时加载；同一模型只会被加载一次。"""
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        model = _models.get(key)
+        if model is None:
+            logger.info("加载模型: %s", key[1])
+            model = loader()
+            _models[key] = model
+    return model
+
+
+def get_detector(model_path=DEFAULT_MODEL_PATH, threads=None):
+    """
+    获取共享的车牌检测后端（见 detector_backends），按文件类型选择 ultralytics 或 ONNX Runtime
+    :param threads: ONNX Runtime 推理线程数；线程数不同的请求各自加载一个会话
+    """
+    def load():
+        from detector_backends import load_backend
+        return load_backend(model_path, threads=threads)
+    return _get_or_load(("detector", model_path, threads), load)
+
+
+def get_ocr(model_name=DEFAULT_OCR_MODEL):
+    """获取共享的 PaddleOCR 文字识别模型。"""
+    def load():
+        from paddleocr import TextRecognition
+        return TextRecognition(model_name=model_name)
+    return _get_or_load(("ocr", model_name), load)
+
+
+def is_loaded(kind, name):
+    """判断模型是否已加载（检测模型不区分线程数），kind 为 "detector" 或 "ocr"。"""
+    return any(key[:2] == (kind, name) for key in list(_models))
+
+
+def warmup(model_path=DEFAULT_MODEL_PATH, ocr_model=DEFAULT_OCR_MODEL, background=True,
+           fast_ocr_model=DEFAULT_FAST_OCR_MODEL, detector_threads=None):
+    """
+    加载模型并用空白输入各推理一次，使首次真实请求不再承担初始化开销
+    :param background: 为 True 时在后台线程中执行，立即返回该线程
+    :param fast_ocr_model: 级联识别的快速 OCR 模型，None 表示不使用
+    :param detector_threads: 与 PlateRecognizer 的 detector_threads 一致，才会预热同一个检测会话
+    """
+    def run():
+        try:
+            get_detector(model_path, detector_threads)([np.zeros((640, 640, 3), dtype=np.uint8)])
+            for name in filter(None, (fast_ocr_model, ocr_model)):
+                get_ocr(name).predict(np.zeros((48, 320, 3), dtype=np.uint8))
+            logger.info("模型预热完成")
+        except Exception:
+            logger.exception("模型预热失败")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
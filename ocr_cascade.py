@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+级联车牌识别：先用轻量的 mobile 识别模型直接识别原始裁剪图，
+只有置信度偏低或结果不符合车牌格式时，才升级到二值化 + 透视校正 + server 模型
+"""
+import threading
+
+from metrics import METRICS
+from models import DEFAULT_FAST_OCR_MODEL, DEFAULT_OCR_MODEL, get_ocr
+from PTL import crop_plate, is_plate_format, preprocess_plate, recognize_crops
+
+CASCADE_STAGES = ("fast", "accurate", "failed")
+
+
+class OcrCascade:
+    def __init__(self, fast_model=DEFAULT_FAST_OCR_MODEL, accurate_model=DEFAULT_OCR_MODEL, min_score=0.9):
+        """
+        :param fast_model: 第一级（快速）OCR 模型名称
+        :param accurate_model: 第二级（精确）OCR 模型名称
+        :param min_score: 第一级结果的最低置信度，低于该值或格式不符时升级
+        """
+        self.fast_model = fast_model
+        self.accurate_model = accurate_model
+        self.min_score = min_score
+        self.counts = dict.fromkeys(CASCADE_STAGES, 0)  # 各级最终给出结果的车牌数
+        self._lock = threading.Lock()
+
+    @property
+    def fast_ocr(self):
+        return get_ocr(self.fast_model)
+
+    @property
+    def accurate_ocr(self):
+        return get_ocr(self.accurate_model)
+
+    def accept(self, text, score):
+        """第一级结果是否可以直接采用。"""
+        return score >= self.min_score and is_plate_format(text)
+
+    def recognize_crops(self, crops, cache=None):
+        """
+        级联识别一组原始车牌裁剪图（BGR，未预处理）
+        :param cache: result_cache.RecognitionCache，两级识别均使用
+        :return: 按输入顺序的 [(文本, 置信度)]
+        """
+        with METRICS.timer("ocr_fast"):
+            outputs = recognize_crops(crops, self.fast_ocr, cache=cache, cache_namespace=self.fast_model)
+        escalate = [i for i, (crop, (text, score)) in enumerate(zip(crops, outputs))
+                    if crop is not None and crop.size and not self.accept(text, score)]
+
+        stages = ["fast" if crop is not None and crop.size else "failed" for crop in crops]
+        if escalate:
+            with METRICS.timer("ocr_accurate"):
+                warped = [preprocess_plate(crops[i]) for i in escalate]
+                accurate = recognize_crops(warped, self.accurate_ocr, cache=cache,
+                                           cache_namespace=self.accurate_model)
+            for i, (text, score) in zip(escalate, accurate):
+                fast_text, fast_score = outputs[i]
+                # 格式正确优先，其次取置信度高者
+                if (is_plate_format(text), score) >= (is_plate_format(fast_text), fast_score):
+                    outputs[i] = (text, score)
+                stages[i] = "accurate" if is_plate_format(outputs[i][0]) else "failed"
+
+        with self._lock:
+            for stage in stages:
+                self.counts[stage] += 1
+        return outputs
+
+    def recognize(self, img, boxes, cache=None):
+        """识别同一帧中的所有车牌，结果与 boxes 顺序一致。"""
+        crops = []
+        for box in boxes:
+            with METRICS.timer("crop"):
+                crops.append(crop_plate(img, box)[0])
+        return self.recognize_crops(crops, cache=cache)
+
+    def merge(self, counts):
+        """累加其他进程中级联识别器的各级计数（见 recognize.py 的 OCR 进程）。"""
+        with self._lock:
+            for stage, count in counts.items():
+                self.counts[stage] += count
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(CASCADE_STAGES, 0)
+
+    def stats(self):
+        """各级命中的车牌数与占比。"""
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {"total": total, **counts,
+                **{f"{stage}_rate": counts[stage] / total if total else 0.0 for stage in CASCADE_STAGES}}
@@ -1,57 +1,23 @@
-import time
-from collections import defaultdict
-import cv2
-from main import ImageEnhancer
+from dedup import RecentPlates
+from models import warmup
+from event_log import EventLog
+from parking import ParkingLot
+from recognizer import PlateRecognizer
+from result_cache import RecognitionCache
+from storage import SessionStore
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog, QMessageBox, QHBoxLayout
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt
 import sys
 
-class ParkingLot:
-    def __init__(self, hourly_rate=5):
-        self.hourly_rate = hourly_rate  # 每小时收费
-        self.active_vehicles = {}  # 车牌号: 入场时间戳
-        self.history = defaultdict(list)  # 车牌号: [(入场时间, 出场时间, 费用)]
-        self.image_enhancer = ImageEnhancer()
-
-    def recognize_plate(self, image_path):
-        """识别图片中的车牌号。"""
-        self.image_enhancer.original_cv = cv2.imread(image_path)
-        self.image_enhancer.detect_image()
-        plate_texts = self.image_enhancer.label_text.text().replace("识别结果：", "").split(" | ")
-        return plate_texts
-
-    def enter(self, plate_number):
-        """车辆入场，记录入场时间。"""
-        if plate_number in self.active_vehicles:
-            return f"车辆 {plate_number} 已在场内。"
-        self.active_vehicles[plate_number] = time.time()
-        return f"车辆 {plate_number} 入场成功。"
-
-    def exit(self, plate_number):
-        """车辆出场，计算费用。"""
-        if plate_number not in self.active_vehicles:
-            return f"车辆 {plate_number} 不在场内。"
-        enter_time = self.active_vehicles.pop(plate_number)
-        exit_time = time.time()
-        hours = (exit_time - enter_time) / 3600
-        fee = round(hours * self.hourly_rate, 2)
-        self.history[plate_number].append((enter_time, exit_time, fee))
-        return f"车辆 {plate_number} 出场，停车时长 {hours:.2f} 小时，应付 {fee} 元。"
-
-    def get_status(self):
-        """查询当前在场车辆。"""
-        return list(self.active_vehicles.keys())
-
-    def get_history(self, plate_number):
-        """查询某车牌的历史记录。"""
-        return self.history.get(plate_number, [])
-
 class ParkingLotGUI(QWidget):
     def __init__(self):
         super().__init__()
         self.resize(1600, 1000)
-        self.parking_lot = ParkingLot()
+        self.parking_lot = ParkingLot(recognizer=PlateRecognizer(cache=RecognitionCache()),
+                                      store=SessionStore("parking.db"), event_log=EventLog("parking_events"))
+        self.plate_scores = {}  # 最近一次识别结果的 车牌号: OCR 置信度
+        self.recent_plates = RecentPlates(window=10.0)  # 同一车牌 10 秒内重复点击入场 / 出场只处理一次
         self.init_ui()
 
     def init_ui(self):
@@ -87,25 +53,58 @@ class ParkingLotGUI(QWidget):
     def open_image(self):
         path, _ = QFileDialog.getOpenFileName(self, "打开图片", "", "Images (*.png *.jpg *.bmp)")
         if path:
-            plate_texts = self.parking_lot.recognize_plate(path)
+            plates = self.parking_lot.recognize_plate(path, with_scores=True)
+            self.plate_scores = {}
+            for text, score in plates:  # 同一帧内重复识别出的车牌只保留置信度最高的一次
+                if text and score > self.plate_scores.get(text, -1.0):
+                    self.plate_scores[text] = score
+            plate_texts = list(self.plate_scores)
             self.label_result.setText("识别结果：" + " | ".join(plate_texts))
             # 展示图片
             pixmap = QPixmap(path)
             self.label_image.setPixmap(pixmap.scaled(self.label_image.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
 
-    def enter_vehicle(self):
+    def current_plates(self, lane, title):
+        """当前识别结果中本车道时间窗口内首次触发的车牌；重复触发的车牌提示后跳过。"""
         plate_texts = self.label_result.text().replace("识别结果：", "").split(" | ")
-        for plate in plate_texts:
+        plates, debounced = [], []
+        for plate in dict.fromkeys(plate_texts):
             if plate:
-                result = self.parking_lot.enter(plate)
-                QMessageBox.information(self, "入场", result)
+                (plates if self.recent_plates.check(lane, plate) else debounced).append(plate)
+        if debounced:
+            QMessageBox.information(self, title, f"车辆 {', '.join(debounced)} "
+                                                 f"{self.recent_plates.window:.0f} 秒内已处理，忽略重复操作。")
+        return plates
+
+    def gate_action(self, lane, title, action):
+        plates = self.current_plates(lane, title)
+        for i, plate in enumerate(plates):
+            try:
+                result = action(plate)
+            except OSError as e:  # 事件日志写入失败
+                # 本车牌及之后未处理的车牌撤销去重登记，允许立即重试
+                for pending in plates[i:]:
+                    self.recent_plates.forget(lane, pending)
+                QMessageBox.critical(self, title, f"记录失败：{e}")
+                return
+            QMessageBox.information(self, title, result)
+
+    def enter_vehicle(self):
+        self.gate_action("enter", "入场", self.parking_lot.enter)
 
     def exit_vehicle(self):
-        plate_texts = self.label_result.text().replace("识别结果：", "").split(" | ")
-        for plate in plate_texts:
-            if plate:
-                result = self.parking_lot.exit(plate)
-                QMessageBox.information(self, "出场", result)
+        self.gate_action("exit", "出场",
+                         lambda plate: self.parking_lot.exit(plate, confidence=self.plate_scores.get(plate)))
+
+    def closeEvent(self, event):
+        self.parking_lot.recognizer.cache.log_stats()
+        try:
+            if self.parking_lot.event_log:
+                self.parking_lot.event_log.close()
+        finally:
+            if self.parking_lot.store:
+                self.parking_lot.store.close()
+        super().closeEvent(event)
 
     def show_status(self):
         status = self.parking_lot.get_status()
@@ -113,6 +112,7 @@ class ParkingLotGUI(QWidget):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    warmup(background=True)
     window = ParkingLotGUI()
     window.show()
     sys.exit(app.exec_()) 
\ No newline at end of file
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from collections import defaultdict
+from fuzzy_match import FuzzyPlateIndex
+from recognizer import PlateRecognizer
+
+logger = logging.getLogger(__name__)
+
+class ParkingLot:
+    def __init__(self, hourly_rate=5, recognizer=None, store=None, fuzzy_index=True, event_log=None,
+                 pricing=None):
+        """
+        :param hourly_rate: 每小时收费
+        :param recognizer: PlateRecognizer，默认使用共享模型
+        :param store: storage.SessionStore，为 None 时只在内存中保存记录
+        :param fuzzy_index: 出场时车牌不在场内则做近似匹配；可传入 FuzzyPlateIndex，False 表示关闭
+        :param event_log: event_log.EventLog，入场 / 出场先落盘再返回，重启后据此恢复在场车辆
+        :param pricing: reports.TieredPricing 等提供 fee(入场时间, 出场时间) 的计价规则，None 表示按 hourly_rate 计费
+        """
+        self.hourly_rate = hourly_rate  # 每小时收费
+        self.pricing = pricing
+        self.store = store
+        self.event_log = event_log
+        if event_log is not None:
+            self.active_vehicles = dict(event_log.active)  # 事件日志是在场车辆的权威来源
+        else:
+            self.active_vehicles = store.load_active() if store else {}  # 车牌号: 入场时间戳
+        self.history = defaultdict(list)  # 车牌号: [(入场时间, 出场时间, 费用)]，仅在未配置 store 时使用
+        self._active_lock = threading.Lock()  # 保护入场时的“检查 + 登记”
+        self.recognizer = recognizer or PlateRecognizer()
+        if fuzzy_index is True:
+            fuzzy_index = FuzzyPlateIndex()
+        # 空索引的 len 为 0，不能用真值判断是否关闭
+        self.fuzzy_index = fuzzy_index if fuzzy_index is not False else None
+        if self.fuzzy_index is not None:
+            for plate in self.active_vehicles:
+                self.fuzzy_index.add(plate)
+
+    def recognize_plate(self, image_path, with_scores=False):
+        """识别图片中的车牌号，with_scores 为 True 时返回 [(车牌号, 置信度)]。"""
+        result = self.recognizer.recognize_file(image_path)
+        if with_scores:
+            return list(zip(result.texts, result.scores))
+        return result.texts
+
+    def check_in(self, plate_number, enter_time=None):
+        """登记入场，车辆已在场内时返回 None，否则返回入场时间。"""
+        enter_time = time.time() if enter_time is None else enter_time
+        # 检查与登记在同一把锁内完成，并发入场时只有一个调用能登记成功
+        with self._active_lock:
+            if plate_number in self.active_vehicles:
+                return None
+            self.active_vehicles[plate_number] = enter_time
+        if self.fuzzy_index is not None:
+            self.fuzzy_index.add(plate_number)
+        if self.event_log is not None:
+            try:
+                self.event_log.append_enter(plate_number, enter_time)
+            except Exception:
+                # 入场未能落盘：撤销内存中的登记，调用方可以重试
+                with self._active_lock:
+                    self.active_vehicles.pop(plate_number, None)
+                if self.fuzzy_index is not None:
+                    self.fuzzy_index.remove(plate_number)
+                raise
+        self._record("record_enter", plate_number, enter_time)
+        return enter_time
+
+    def _record(self, method, *args):
+        # SessionStore 提交失败时写操作仍留在待提交队列中，下次提交时重试，因此不撤销内存状态
+        if not self.store:
+            return
+        try:
+            getattr(self.store, method)(*args)
+        except Exception:
+            logger.exception("停车记录暂未写入数据库，将在下次提交时重试")
+
+    def match_plate(self, plate_number, confidence=None):
+        """将识别出的车牌号对应到在场车牌，允许少量 OCR 误识别；找不到时返回 None。"""
+        if plate_number in self.active_vehicles:
+            return plate_number
+        if self.fuzzy_index is None:
+            return None
+        matched, _ = self.fuzzy_index.match(plate_number, confidence)
+        return matched
+
+    def check_out(self, plate_number, exit_time=None, confidence=None):
+        """
+        登记出场，车辆不在场内时返回 None，否则返回 (在场车牌号, 入场时间, 出场时间)
+        :param confidence: 车牌识别置信度，用于决定近似匹配的容忍度
+        """
+        matched = self.match_plate(plate_number, confidence)
+        enter_time = self.active_vehicles.pop(matched, None) if matched is not None else None
+        if enter_time is None:
+            return None
+        exit_time = time.time() if exit_time is None else exit_time
+        if self.fuzzy_index is not None:
+            self.fuzzy_index.remove(matched)
+        if self.event_log is not None:
+            try:
+                self.event_log.append_exit(matched, enter_time, exit_time)
+            except Exception:
+                # 出场未能落盘：车辆恢复为在场，调用方可以重试
+                self.active_vehicles[matched] = enter_time
+                if self.fuzzy_index is not None:
+                    self.fuzzy_index.add(matched)
+                raise
+        self._record("record_leave", matched)
+        return matched, enter_time, exit_time
+
+    def compute_fee(self, enter_time, exit_time):
+        """按停车时长计算费用。"""
+        if self.pricing is not None:
+            return self.pricing.fee(enter_time, exit_time)
+        hours = (exit_time - enter_time) / 3600
+        return round(hours * self.hourly_rate, 2)
+
+    def settle(self, plate_number, enter_time, exit_time):
+        """计算费用并写入历史记录与事件日志，返回费用。"""
+        fee = self.compute_fee(enter_time, exit_time)
+        if self.event_log is not None:
+            try:
+                # 车辆已放行，结算事件随下一次组提交落盘即可，不等待 fsync
+                self.event_log.append_settle(plate_number, enter_time, exit_time, fee, wait=False)
+            except Exception:
+                logger.exception("结算事件写入失败：%s 费用 %s", plate_number, fee)
+        if self.store:
+            self.store.record_session(plate_number, enter_time, exit_time, fee)
+        else:
+            self.history[plate_number].append((enter_time, exit_time, fee))
+        return fee
+
+    def enter(self, plate_number):
+        """车辆入场，记录入场时间。"""
+        if self.check_in(plate_number) is None:
+            return f"车辆 {plate_number} 已在场内。"
+        return f"车辆 {plate_number} 入场成功。"
+
+    def exit(self, plate_number, confidence=None):
+        """车辆出场，计算费用。"""
+        stay = self.check_out(plate_number, confidence=confidence)
+        if stay is None:
+            return f"车辆 {plate_number} 不在场内。"
+        matched, enter_time, exit_time = stay
+        hours = (exit_time - enter_time) / 3600
+        fee = self.settle(matched, enter_time, exit_time)
+        return f"车辆 {matched} 出场，停车时长 {hours:.2f} 小时，应付 {fee} 元。"
+
+    def get_status(self):
+        """查询当前在场车辆。"""
+        return list(self.active_vehicles.keys())
+
+    def get_history(self, plate_number):
+        """查询某车牌的历史记录。"""
+        if self.store:
+            return self.store.history(plate_number)
+        return self.history.get(plate_number, [])
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+基于 QThreadPool 的后台任务：耗时的增强与识别在工作线程中执行，结果通过信号回到界面线程
+"""
+import itertools
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class TaskSignals(QObject):
+    finished = pyqtSignal(int, object)  # 任务编号, 结果
+    failed = pyqtSignal(int, str)       # 任务编号, 错误信息
+    released = pyqtSignal(int)          # 任务编号；无论成功、失败或取消，执行结束后都会发出
+
+
+class Task(QRunnable):
+    def __init__(self, task_id, fn, *args, **kwargs):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self.cancelled = False
+        self.completed = False  # 结果已送达界面线程
+        self.setAutoDelete(False)  # 由 TaskRunner 持有引用，便于取消
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            try:
+                result = self.fn(*self.args, **self.kwargs)
+            except Exception:
+                if not self.cancelled:
+                    self.signals.failed.emit(self.task_id, traceback.format_exc())
+                return
+            if not self.cancelled:
+                self.signals.finished.emit(self.task_id, result)
+        finally:
+            self.signals.released.emit(self.task_id)
+
+
+class TaskRunner:
+    def __init__(self, max_threads=None):
+        """
+        :param max_threads: 线程池大小；模型推理非线程安全，识别任务应使用单线程
+        """
+        self.pool = QThreadPool()
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self._ids = itertools.count(1)
+        self._latest = {}   # 任务类别: 最新的 Task
+        self._tasks = {}    # 任务编号: Task，任务执行结束前保持引用
+
+    def submit(self, fn, *args, on_finished=None, on_failed=None, key=None, priority=0, **kwargs):
+        """
+        提交后台任务
+        :param key: 任务类别；同类别的新任务会取消尚未完成的旧任务，旧任务的结果不会再送达
+        :param priority: 排队优先级，数值大的先执行
+        :return: 任务编号
+        """
+        task = Task(next(self._ids), fn, *args, **kwargs)
+        if key is not None:
+            stale = self._latest.get(key)
+            if stale is not None:
+                self.cancel(stale.task_id)
+            self._latest[key] = task
+
+        def done(task_id, result):
+            task.completed = True
+            if on_finished and not task.cancelled:
+                on_finished(task_id, result)
+
+        def error(task_id, message):
+            task.completed = True
+            if on_failed and not task.cancelled:
+                on_failed(task_id, message)
+
+        task.signals.finished.connect(done)
+        task.signals.failed.connect(error)
+        task.signals.released.connect(lambda task_id: self._tasks.pop(task_id, None))
+        self._tasks[task.task_id] = task
+        self.pool.start(task, priority)
+        return task.task_id
+
+    def cancel(self, task_id):
+        """取消任务：仍在排队的直接移出线程池，正在执行的丢弃其结果。"""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        task.cancel()
+        if self.pool.tryTake(task):
+            # 从未开始执行，不会再发出 released
+            self._tasks.pop(task_id, None)
+
+    def cancel_key(self, key):
+        """取消某类别中尚未完成的任务。"""
+        task = self._latest.pop(key, None)
+        if task is not None:
+            self.cancel(task.task_id)
+
+    def pending(self):
+        """尚未完成且未被取消的任务数。"""
+        return sum(1 for task in self._tasks.values() if not task.cancelled and not task.completed)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+批量识别命令行工具：遍历目录或文件列表，线程池解码、YOLO 批量检测、进程池并行 OCR，
+结果以 JSONL 或 CSV 流式写出，重复运行时自动跳过输出文件中已有的图片（断点续跑）
+
+    python recognize.py snapshots/ -o results.jsonl --ocr-workers 8
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import cv2
+from tqdm import tqdm
+
+from metrics import METRICS, JsonFileSink
+from models import DEFAULT_FAST_OCR_MODEL, DEFAULT_MODEL_PATH, DEFAULT_OCR_MODEL, get_ocr
+from ocr_cascade import OcrCascade
+from PTL import crop_plate, filter_plate_text, preprocess_plate, recognize_crops
+from recognizer import PlateRecognizer
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+CSV_FIELDS = ["path", "plates", "raw_texts", "scores", "confidences", "boxes", "error"]
+
+
+def iter_images(inputs, list_file=None):
+    """依次产出输入目录（递归）、图片文件以及列表文件中的图片路径。"""
+    for item in inputs:
+        if os.path.isdir(item):
+            for maindir, _, file_name_list in os.walk(item):
+                for filename in sorted(file_name_list):
+                    if filename.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(maindir, filename)
+        else:
+            yield item
+    if list_file:
+        with open(list_file, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def _complete_length(output, block=65536):
+    """文件中以换行结尾的完整部分的字节数；上次运行中断时最后一行可能只写了一半。"""
+    with open(output, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def load_checkpoint(output, fmt):
+    """读取已有输出文件中处理过的图片路径；最后一行不完整时忽略。"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "rb") as f:
+        text = f.read(_complete_length(output)).decode("utf-8")
+    lines = text.splitlines(keepends=True)
+    if fmt == "csv":
+        for row in csv.DictReader(lines):
+            if row.get("path"):
+                done.add(row["path"])
+    else:
+        for line in lines:
+            try:
+                done.add(json.loads(line)["path"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+class ResultWriter:
+    def __init__(self, output, fmt):
+        if os.path.exists(output):
+            # 截掉上次运行中断时留下的不完整最后一行，该图片会被重新识别
+            length = _complete_length(output)
+            if length < os.path.getsize(output):
+                os.truncate(output, length)
+        exists = os.path.exists(output) and os.path.getsize(output) > 0
+        self.fmt = fmt
+        self.file = open(output, "a", encoding="utf-8", newline="")
+        if fmt == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if not exists:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.fmt == "csv":
+            self.writer.writerow({
+                "path": record["path"],
+                "plates": "|".join(record.get("texts", [])),
+                "raw_texts": "|".join(record.get("raw_texts", [])),
+                "scores": "|".join(f"{s:.4f}" for s in record.get("scores", [])),
+                "confidences": "|".join(f"{c:.4f}" for c in record.get("confidences", [])),
+                "boxes": "|".join(",".join(f"{v:.1f}" for v in box) for box in record.get("boxes", [])),
+                "error": record.get("error", ""),
+            })
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+_cascade = None  # OCR 进程内的级联识别器
+
+
+def _init_ocr_worker(ocr_model, fast_ocr_model=None, min_ocr_score=0.9):
+    # 每个 OCR 进程只加载一次模型，并限制进程内线程数，让多进程按核数线性扩展
+    global _cascade
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    cv2.setNumThreads(1)
+    get_ocr(ocr_model)
+    if fast_ocr_model:
+        _cascade = OcrCascade(fast_ocr_model, ocr_model, min_ocr_score)
+        get_ocr(fast_ocr_model)
+
+
+def _ocr_job(crops, ocr_model):
+    # 返回 (识别结果, 本批各级计数)；级联计数由主进程汇总，未启用级联时为 None
+    if _cascade is not None:
+        _cascade.reset()
+        outputs = _cascade.recognize_crops(crops)
+        return outputs, dict(_cascade.counts)
+    warped = [preprocess_plate(crop) if crop is not None else None for crop in crops]
+    return recognize_crops(warped, get_ocr(ocr_model)), None
+
+
+def _ocr_worker_args(recognizer):
+    cascade = recognizer.cascade
+    if cascade is None:
+        return recognizer.ocr_model, None
+    return recognizer.ocr_model, cascade.fast_model, cascade.min_score
+
+
+def _decode(path):
+    with METRICS.timer("decode"):
+        return path, cv2.imread(path)
+
+
+def run(paths, writer, recognizer, batch_size=16, decode_threads=4, ocr_workers=None, max_pending=256):
+    """处理所有图片并写出结果，返回成功写出的记录数；各 OCR 进程的级联计数汇总到 recognizer.cascade。"""
+    ocr_workers = ocr_workers or os.cpu_count() or 1
+    written = 0
+    progress = tqdm(total=len(paths), desc="识别进度", unit="img")
+
+    def finish(futures):
+        nonlocal written
+        for future in futures:
+            record = pending.pop(future)
+            try:
+                outputs, counts = future.result()
+                if counts:
+                    recognizer.cascade.merge(counts)
+                record["raw_texts"] = [text for text, _ in outputs]
+                record["scores"] = [score for _, score in outputs]
+                record["texts"] = [filter_plate_text(text) for text in record["raw_texts"]]
+            except Exception as e:
+                record["error"] = str(e)
+            writer.write(record)
+            written += 1
+            progress.update(1)
+
+    pending = {}
+    with ThreadPoolExecutor(decode_threads) as decoder, \
+            ProcessPoolExecutor(ocr_workers, initializer=_init_ocr_worker,
+                                initargs=_ocr_worker_args(recognizer)) as ocr_pool:
+        batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+        # 预取下一批图片，使解码与 YOLO 推理重叠
+        next_batch = [decoder.submit(_decode, p) for p in batches[0]] if batches else []
+        for index in range(len(batches)):
+            decoded = [f.result() for f in next_batch]
+            if index + 1 < len(batches):
+                next_batch = [decoder.submit(_decode, p) for p in batches[index + 1]]
+
+            valid = [(path, image) for path, image in decoded if image is not None]
+            for path, image in decoded:
+                if image is None:
+                    writer.write({"path": path, "error": "无法读取图片"})
+                    written += 1
+                    progress.update(1)
+            if not valid:
+                continue
+
+            detections = recognizer.detect_batch([image for _, image in valid])
+            for (path, image), (boxes, confidences, classes, _) in zip(valid, detections):
+                crops = [crop_plate(image, box)[0] for box in boxes]
+                crops = [crop.copy() if crop is not None else None for crop in crops]
+                record = {"path": path, "boxes": boxes, "confidences": confidences, "classes": classes}
+                pending[ocr_pool.submit(_ocr_job, crops, recognizer.ocr_model)] = record
+
+            while len(pending) >= max_pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                finish(done)
+
+        finish(list(pending))
+    progress.close()
+    return written
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="批量车牌识别")
+    parser.add_argument("inputs", nargs="*", help="图片目录或图片文件")
+    parser.add_argument("--list", help="每行一个图片路径的列表文件")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="输出文件（.jsonl 或 .csv）")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="输出格式，默认按扩展名判断")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="检测模型路径（.pt 或 .onnx）")
+    parser.add_argument("--detector-threads", type=int, default=None, help="ONNX Runtime 检测线程数")
+    parser.add_argument("--ocr-model", default=DEFAULT_OCR_MODEL, help="OCR 模型名称")
+    parser.add_argument("--fast-ocr-model", default=DEFAULT_FAST_OCR_MODEL,
+                        help="级联识别的快速 OCR 模型，传空字符串则只用 --ocr-model")
+    parser.add_argument("--min-ocr-score", type=float, default=0.9, help="快速模型结果低于该置信度时升级")
+    parser.add_argument("--batch-size", type=int, default=16, help="YOLO 批大小")
+    parser.add_argument("--decode-threads", type=int, default=4, help="解码线程数")
+    parser.add_argument("--ocr-workers", type=int, default=None, help="OCR 进程数，默认等于 CPU 核数")
+    parser.add_argument("--metrics", help="将主进程各阶段耗时（解码、检测）以 JSON 写入该文件")
+    args = parser.parse_args()
+
+    if not args.inputs and not args.list:
+        parser.error("请指定图片目录、图片文件或 --list")
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+
+    done = load_checkpoint(args.output, fmt)
+    paths = [p for p in iter_images(args.inputs, args.list) if p not in done]
+    logger.info("待处理 %d 张图片，已跳过 %d 张", len(paths), len(done))
+
+    recognizer = PlateRecognizer(args.model, args.ocr_model, args.detector_threads,
+                                 fast_ocr_model=args.fast_ocr_model or None, min_ocr_score=args.min_ocr_score)
+    writer = ResultWriter(args.output, fmt)
+    start = time.perf_counter()
+    try:
+        written = run(paths, writer, recognizer, args.batch_size, args.decode_threads, args.ocr_workers)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    logger.info("完成 %d 张，用时 %.1f 秒，%.2f 张/秒", written, elapsed, written / max(elapsed, 1e-6))
+    if recognizer.cascade is not None:
+        stats = recognizer.cascade.stats()
+        logger.info("级联 OCR：共 %d 个车牌，快速模型直接采用 %d 个（%.1f%%），升级后识别 %d 个（%.1f%%），"
+                    "失败 %d 个（%.1f%%）", stats["total"], stats["fast"], stats["fast_rate"] * 100,
+                    stats["accurate"], stats["accurate_rate"] * 100, stats["failed"], stats["failed_rate"] * 100)
+    if args.metrics:
+        JsonFileSink(args.metrics).emit(METRICS)
+
+
+if __name__ == "__main__":
+    main()
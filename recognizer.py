@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+不依赖 PyQt 的车牌识别引擎，供 GUI、停车场系统以及无显示器的服务器共同使用
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass, field, replace
+
+import cv2
+import numpy as np
+
+from dedup import nms
+from metrics import METRICS, profiled
+from models import DEFAULT_FAST_OCR_MODEL, DEFAULT_MODEL_PATH, DEFAULT_OCR_MODEL, get_detector, get_ocr
+from ocr_cascade import OcrCascade
+from PTL import crop_plate, filter_plate_text, plate_recognize_batch, preprocess_plate, recognize_crops
+
+logger = logging.getLogger(__name__)
+
+
+CLASS_NAMES = {0: "blue_plate", 1: "green_plate"}
+CLASS_COLORS = {0: (255, 128, 0), 1: (0, 200, 0)}
+
+
+def box_list(boxes):
+    # N×4 数组转为 [[x1, y1, x2, y2]] 列表
+    return [[float(v) for v in box] for box in boxes]
+
+
+def draw_detections(image, boxes, confidences, classes, out=None):
+    """
+    画出检测框和置信度，返回 BGR 图像
+    :param out: 与 image 同尺寸的画布，传入时在其上绘制以复用内存（可以就是 image 本身），否则画在副本上
+    """
+    if out is None:
+        canvas = image.copy()
+    else:
+        canvas = out
+        if out is not image:
+            np.copyto(out, image)
+    for box, conf, cls in zip(boxes, confidences, classes):
+        x1, y1, x2, y2 = map(int, box)
+        color = CLASS_COLORS.get(cls, (0, 0, 255))
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(canvas, f"{CLASS_NAMES.get(cls, cls)} {conf:.2f}", (x1, max(y1 - 6, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return canvas
+
+
+@dataclass
+class RecognitionResult:
+    """单张图像的识别结果，各列表按检测框顺序一一对应。"""
+    boxes: list = field(default_factory=list)        # [x1, y1, x2, y2]
+    confidences: list = field(default_factory=list)  # YOLO 检测置信度
+    classes: list = field(default_factory=list)      # 0: blue_plate, 1: green_plate
+    raw_texts: list = field(default_factory=list)    # OCR 原始文本
+    texts: list = field(default_factory=list)        # 过滤非法字符后的车牌号
+    scores: list = field(default_factory=list)       # OCR 识别置信度
+    timings: dict = field(default_factory=dict)      # 各阶段耗时（秒）
+    annotated: object = None                         # 标注检测框后的 BGR 图像
+    profile: str = ""                                # 剖析报告（仅在开启剖析时）
+
+    @property
+    def plates(self):
+        """非空的车牌号列表。"""
+        return [text for text in self.texts if text]
+
+
+class PlateRecognizer:
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, ocr_model=DEFAULT_OCR_MODEL, detector_threads=None,
+                 cache=None, fast_ocr_model=DEFAULT_FAST_OCR_MODEL, min_ocr_score=0.9, nms_iou=0.5):
+        """
+        :param model_path: 车牌检测模型路径（.pt、.onnx 或 OpenVINO 导出目录）
+        :param ocr_model: PaddleOCR 文字识别模型名称
+        :param detector_threads: ONNX Runtime 检测后端的推理线程数
+        :param cache: result_cache.RecognitionCache，重复识别同一画面或同一车牌时直接复用结果
+        :param fast_ocr_model: 级联识别的快速 OCR 模型（见 ocr_cascade），None 表示只用 ocr_model
+        :param min_ocr_score: 快速模型结果的最低置信度，低于该值或格式不符时改用 ocr_model
+        :param nms_iou: 不分类别 NMS 的 IoU 阈值，同一车牌被检测为蓝牌和绿牌等重叠框只保留一个再做 OCR；None 表示关闭
+        模型由 models 注册表在首次识别时加载，并与其他识别器共享
+        """
+        self.model_path = model_path
+        self.ocr_model = ocr_model
+        self.detector_threads = detector_threads
+        self.cache = cache
+        self.cascade = OcrCascade(fast_ocr_model, ocr_model, min_ocr_score) if fast_ocr_model else None
+        self.nms_iou = nms_iou
+        self.cache_namespace = self._cache_namespace()
+
+    def _cache_namespace(self):
+        # 整图缓存键的配置指纹：检测模型（含文件大小与修改时间，重新训练覆盖同名权重也会失效）、OCR 与级联参数、NMS
+        try:
+            st = os.stat(self.model_path)
+            stamp = f"{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            stamp = ""
+        cascade = f"{self.cascade.fast_model}:{self.cascade.min_score}" if self.cascade is not None else ""
+        return "|".join([self.model_path, stamp, self.ocr_model, cascade, str(self.nms_iou)])
+
+    @property
+    def model(self):
+        return get_detector(self.model_path, self.detector_threads)
+
+    @property
+    def ocr(self):
+        return get_ocr(self.ocr_model)
+
+    def detect(self, image, imgsz=None):
+        """
+        仅运行车牌检测
+        :param image: cv2 读取的 BGR 图像
+        :param imgsz: 推理尺寸，None 使用模型默认值；ONNX 后端固定为导出时的尺寸
+        :return: (boxes, confidences, classes, 后端原始结果)
+        """
+        return self.detect_batch([image], imgsz=imgsz)[0]
+
+    def detect_batch(self, images, imgsz=None):
+        """对多张 BGR 图像做一次批量检测，按输入顺序返回 detect 的结果。"""
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        outputs = []
+        for d in self.model(images, **kwargs):
+            boxes, confidences, classes = box_list(d.boxes), [float(c) for c in d.confidences], [int(c) for c in d.classes]
+            if self.nms_iou is not None and len(boxes) > 1:
+                keep = nms(boxes, confidences, self.nms_iou)
+                if len(keep) < len(boxes):
+                    logger.debug("NMS 去除 %d 个重叠检测框", len(boxes) - len(keep))
+                    boxes = [boxes[i] for i in keep]
+                    confidences = [confidences[i] for i in keep]
+                    classes = [classes[i] for i in keep]
+            outputs.append((boxes, confidences, classes, d.raw))
+        return outputs
+
+    def recognize_boxes(self, image, boxes):
+        """识别图像中给定检测框内的车牌，返回与 boxes 顺序一致的 [(文本, 置信度)]。"""
+        if self.cascade is not None:
+            return self.cascade.recognize(image, boxes, cache=self.cache)
+        return plate_recognize_batch(image, boxes, self.ocr, with_scores=True, cache=self.cache,
+                                     cache_namespace=self.ocr_model)
+
+    def ocr_crops(self, crops):
+        """识别一组原始车牌裁剪图（可含 None），返回按输入顺序的 [(文本, 置信度)]。"""
+        if self.cascade is not None:
+            return self.cascade.recognize_crops(crops, cache=self.cache)
+        warped = [preprocess_plate(crop) if crop is not None else None for crop in crops]
+        return recognize_crops(warped, self.ocr, cache=self.cache, cache_namespace=self.ocr_model)
+
+    def recognize_batch(self, images):
+        """
+        批量识别多张 BGR 图像：一次批量检测，所有图像中的车牌合并为一次 OCR
+        :return: 与 images 顺序一致的 [RecognitionResult]
+        """
+        start = time.perf_counter()
+        with METRICS.timer("detect") as detect:
+            detections = self.detect_batch(images)
+        results, crops, owners = [], [], []
+        for index, (image, (boxes, confidences, classes, _)) in enumerate(zip(images, detections)):
+            results.append(RecognitionResult(boxes=boxes, confidences=confidences, classes=classes))
+            for box in boxes:
+                with METRICS.timer("crop"):
+                    crops.append(crop_plate(image, box)[0])
+                owners.append(index)
+
+        ocr_start = time.perf_counter()
+        for index, (text, score) in zip(owners, self.ocr_crops(crops)):
+            results[index].raw_texts.append(text)
+            results[index].scores.append(score)
+        with METRICS.timer("postfilter"):
+            for result in results:
+                result.texts = [filter_plate_text(text) for text in result.raw_texts]
+        end = time.perf_counter()
+        for result in results:
+            # 同一批内的图像共享检测与 OCR 调用，记录的是整批耗时
+            result.timings.update(detect=detect.elapsed, ocr=end - ocr_start, total=end - start)
+        return results
+
+    def recognize(self, image, annotate=False, profile=None):
+        """
+        识别 BGR 图像中的所有车牌
+        :param image: cv2 读取的 BGR 图像
+        :param annotate: 是否生成标注检测框的图像
+        :param profile: 对本次请求做剖析，"cprofile" 或 "sampling"，报告写入 result.profile
+        :return: RecognitionResult
+        """
+        key = None
+        if self.cache is not None and profile is None:
+            start = time.perf_counter()
+            key, entry = self.cache.lookup(image, self.cache_namespace)
+            if entry is not None:
+                result = self._from_cache(image, entry[0], annotate)
+                result.timings["cache"] = result.timings["total"] = time.perf_counter() - start
+                return result
+
+        with profiled(profile) as prof:
+            result = self._recognize(image, annotate)
+        result.profile = prof.report
+        if key is not None:
+            self.cache.store(key, image, replace(result, annotated=None), result.timings["total"],
+                             self.cache_namespace)
+        return result
+
+    def _from_cache(self, image, cached, annotate):
+        # 缓存命中：复制列表避免调用方修改缓存内容，标注图按当前图像重新绘制
+        result = RecognitionResult(boxes=[list(box) for box in cached.boxes], confidences=list(cached.confidences),
+                                   classes=list(cached.classes), raw_texts=list(cached.raw_texts),
+                                   texts=list(cached.texts), scores=list(cached.scores))
+        if annotate:
+            result.annotated = draw_detections(image, result.boxes, result.confidences, result.classes)
+        return result
+
+    def _recognize(self, image, annotate):
+        result = RecognitionResult()
+        with METRICS.timer("total") as total:
+            with METRICS.timer("detect") as detect:
+                result.boxes, result.confidences, result.classes, detections = self.detect(image)
+            result.timings["detect"] = detect.elapsed
+
+            start = time.perf_counter()
+            outputs = self.recognize_boxes(image, result.boxes)
+            result.raw_texts = [text for text, _ in outputs]
+            result.scores = [score for _, score in outputs]
+            with METRICS.timer("postfilter"):
+                result.texts = [filter_plate_text(text) for text in result.raw_texts]
+            result.timings["ocr"] = time.perf_counter() - start
+
+            if annotate:
+                if detections is not None and len(detections.boxes) == len(result.boxes):  # NMS 未去除检测框
+                    result.annotated = detections.plot()
+                else:
+                    result.annotated = draw_detections(image, result.boxes, result.confidences, result.classes)
+        result.timings["total"] = total.elapsed
+        logger.debug("识别完成: %s (%.1f ms)", result.texts, total.elapsed * 1000)
+        return result
+
+    def recognize_file(self, image_path, annotate=False, profile=None):
+        """读取图片文件并识别，图片无法读取时抛出 ValueError。"""
+        with METRICS.timer("decode") as decode:
+            image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"无法读取图片: {image_path}")
+        result = self.recognize(image, annotate=annotate, profile=profile)
+        result.timings["decode"] = decode.elapsed
+        return result
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+停车会话的列式历史与向量化报表：收入按时间分桶 / 按日按月统计、在场车辆数曲线与峰值、
+停车时长分位数，以及分段计价规则的批量计算
+
+    python reports.py parking.db --period month
+"""
+import argparse
+import time
+
+import numpy as np
+
+
+class TieredPricing:
+    def __init__(self, tiers=((None, 5.0),), free_minutes=0, daily_cap=None):
+        """
+        分段计价：每段按小时费率计费，累加各段费用
+        :param tiers: [(该段截止的累计小时数, 每小时费率)]，最后一段截止为 None 表示不封顶
+        :param free_minutes: 停车不超过该时长免费
+        :param daily_cap: 每 24 小时的费用上限，None 表示不设上限
+        默认值等价于原先的 时长 × 5 元/小时
+        """
+        starts, lengths, rates = [], [], []
+        start = 0.0
+        for upto, rate in tiers:
+            starts.append(start)
+            lengths.append(np.inf if upto is None else upto - start)
+            rates.append(rate)
+            start = np.inf if upto is None else upto
+        self.starts = np.array(starts)
+        self.lengths = np.array(lengths)
+        self.rates = np.array(rates)
+        self.free_minutes = free_minutes
+        self.daily_cap = daily_cap
+
+    def _tiered(self, hours):
+        # 每段计费时长 = clip(总时长 - 段起点, 0, 段长度)，与费率做矩阵乘法
+        return np.clip(hours[:, None] - self.starts, 0, self.lengths) @ self.rates
+
+    def compute(self, enter, exit):
+        """批量计算费用，enter / exit 为秒级时间戳数组，返回保留两位小数的费用数组。"""
+        hours = np.maximum(np.asarray(exit, dtype=np.float64) - np.asarray(enter, dtype=np.float64), 0) / 3600
+        if self.daily_cap is None:
+            fees = self._tiered(hours)
+        else:
+            days, rest = np.divmod(hours, 24)
+            fees = days * min(self._tiered(np.array([24.0]))[0], self.daily_cap) + \
+                np.minimum(self._tiered(rest), self.daily_cap)
+        fees[hours * 60 <= self.free_minutes] = 0.0
+        return np.round(fees, 2)
+
+    def fee(self, enter_time, exit_time):
+        """单次停车的费用。"""
+        return float(self.compute([enter_time], [exit_time])[0])
+
+
+class SessionHistory:
+    def __init__(self, capacity=1024):
+        """
+        列式存储的停车会话：车牌编号、入场时间、出场时间、费用各为一个 NumPy 数组
+        :param capacity: 初始容量，追加时按倍数扩容
+        """
+        self.plates = []        # 车牌号列表，plate_ids 为其下标
+        self._plate_index = {}  # 车牌号: 编号
+        self.size = 0
+        self._plate_ids = np.empty(capacity, dtype=np.int32)
+        self._enter = np.empty(capacity, dtype=np.float64)
+        self._exit = np.empty(capacity, dtype=np.float64)
+        self._fee = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def plate_ids(self):
+        return self._plate_ids[:self.size]
+
+    @property
+    def enter(self):
+        return self._enter[:self.size]
+
+    @property
+    def exit(self):
+        return self._exit[:self.size]
+
+    @property
+    def fee(self):
+        return self._fee[:self.size]
+
+    def _plate_id(self, plate):
+        plate_id = self._plate_index.get(plate)
+        if plate_id is None:
+            plate_id = self._plate_index[plate] = len(self.plates)
+            self.plates.append(plate)
+        return plate_id
+
+    def _reserve(self, n):
+        if self.size + n <= len(self._enter):
+            return
+        capacity = max(self.size + n, 2 * len(self._enter))
+        for name in ("_plate_ids", "_enter", "_exit", "_fee"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, plate, enter_time, exit_time, fee):
+        self._reserve(1)
+        i = self.size
+        self._plate_ids[i] = self._plate_id(plate)
+        self._enter[i], self._exit[i], self._fee[i] = enter_time, exit_time, fee
+        self.size += 1
+
+    def extend(self, plates, enter, exit, fee):
+        """批量追加，各参数为等长序列。"""
+        n = len(enter)
+        self._reserve(n)
+        s = slice(self.size, self.size + n)
+        self._plate_ids[s] = [self._plate_id(p) for p in plates]
+        self._enter[s], self._exit[s], self._fee[s] = enter, exit, fee
+        self.size += n
+
+    @classmethod
+    def from_store(cls, store, chunk=100000):
+        """从 storage.SessionStore 读取全部会话。"""
+        history = cls()
+        for rows in store.iter_sessions(chunk):
+            plates, enter, exit, fee = zip(*rows)
+            history.extend(plates, enter, exit, fee)
+        return history
+
+    def save(self, path):
+        """保存为 .npz 文件。"""
+        np.savez(path, plates=np.array(self.plates, dtype=object), plate_ids=self.plate_ids,
+                 enter=self.enter, exit=self.exit, fee=self.fee)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=True)
+        history = cls(capacity=max(len(data["enter"]), 1))
+        history.plates = list(data["plates"])
+        history._plate_index = {plate: i for i, plate in enumerate(history.plates)}
+        n = len(data["enter"])
+        history._plate_ids[:n], history._enter[:n] = data["plate_ids"], data["enter"]
+        history._exit[:n], history._fee[:n] = data["exit"], data["fee"]
+        history.size = n
+        return history
+
+    def sessions_of(self, plate):
+        """某车牌的历史记录 [(入场时间, 出场时间, 费用)]，按入场时间排序。"""
+        plate_id = self._plate_index.get(plate)
+        if plate_id is None:
+            return []
+        idx = np.flatnonzero(self.plate_ids == plate_id)
+        idx = idx[np.argsort(self.enter[idx], kind="stable")]
+        return list(zip(self.enter[idx].tolist(), self.exit[idx].tolist(), self.fee[idx].tolist()))
+
+    def _mask(self, t1, t2, column):
+        values = self.exit if column == "exit" else self.enter
+        return (values >= t1) & (values < t2)
+
+    # ---------- 报表 ----------
+
+    def revenue_by_bucket(self, t1, t2, bucket_seconds=3600):
+        """
+        按出场时间等宽分桶统计收入
+        :return: (桶起始时间数组, 收入数组, 车次数组)，包含没有收入的空桶
+        """
+        mask = self._mask(t1, t2, "exit")
+        buckets = int(np.ceil((t2 - t1) / bucket_seconds))
+        index = ((self.exit[mask] - t1) // bucket_seconds).astype(np.int64)
+        revenue = np.bincount(index, weights=self.fee[mask], minlength=buckets)
+        counts = np.bincount(index, minlength=buckets)
+        return t1 + np.arange(buckets) * bucket_seconds, revenue, counts
+
+    def revenue_by_period(self, t1, t2, period="day", utc_offset_hours=8):
+        """
+        按自然日或自然月统计收入（按出场时间）
+        :param period: "day" 或 "month"
+        :param utc_offset_hours: 所在时区，默认北京时间
+        :return: (日期字符串数组, 收入数组, 车次数组)
+        """
+        unit = {"day": "D", "month": "M"}[period]
+        mask = self._mask(t1, t2, "exit")
+        local = (self.exit[mask] + utc_offset_hours * 3600).astype("datetime64[s]")
+        periods, index = np.unique(local.astype(f"datetime64[{unit}]"), return_inverse=True)
+        revenue = np.bincount(index, weights=self.fee[mask], minlength=len(periods))
+        counts = np.bincount(index, minlength=len(periods))
+        return periods.astype(str), revenue, counts
+
+    def _sorted_times(self, active_enter_times=()):
+        enters = np.sort(np.concatenate([self.enter, np.asarray(active_enter_times, dtype=np.float64)]))
+        exits = np.sort(self.exit)
+        return enters, exits
+
+    def occupancy_at(self, times, active_enter_times=()):
+        """
+        给定时刻的在场车辆数：入场时间 <= t 的会话数减去出场时间 <= t 的会话数
+        :param active_enter_times: 仍在场车辆的入场时间，计入占用
+        """
+        enters, exits = self._sorted_times(active_enter_times)
+        times = np.asarray(times, dtype=np.float64)
+        return np.searchsorted(enters, times, side="right") - np.searchsorted(exits, times, side="right")
+
+    def occupancy_curve(self, t1, t2, step=300, active_enter_times=()):
+        """按固定步长采样的在场车辆数曲线，返回 (时刻数组, 车辆数数组)。"""
+        times = np.arange(t1, t2, step, dtype=np.float64)
+        return times, self.occupancy_at(times, active_enter_times)
+
+    def peak_occupancy(self, t1=None, t2=None, active_enter_times=()):
+        """
+        扫描所有入场 / 出场事件求在场车辆数峰值（同一时刻先出后入）
+        :return: (峰值车辆数, 首次达到峰值的时刻)
+        """
+        enters, exits = self._sorted_times(active_enter_times)
+        times = np.concatenate([exits, enters])
+        deltas = np.concatenate([np.full(len(exits), -1, np.int64), np.ones(len(enters), np.int64)])
+        order = np.lexsort((deltas, times))  # 按时间排序，同一时刻 -1 在前
+        times, counts = times[order], np.cumsum(deltas[order])
+        if t1 is not None or t2 is not None:
+            lo = -np.inf if t1 is None else t1
+            hi = np.inf if t2 is None else t2
+            start = np.searchsorted(times, lo, side="left")
+            # 区间起点之前已在场的车辆数作为初始值
+            base = counts[start - 1] if start > 0 else 0
+            keep = (times >= lo) & (times < hi)
+            times, counts = np.concatenate([[lo], times[keep]]), np.concatenate([[base], counts[keep]])
+        if not len(counts):
+            return 0, None
+        i = int(np.argmax(counts))
+        return int(counts[i]), float(times[i])
+
+    def dwell_percentiles(self, qs=(50, 90, 95, 99), t1=None, t2=None):
+        """停车时长分位数（秒），可按出场时间筛选，返回 {分位: 时长}。"""
+        dwell = self.exit - self.enter
+        if t1 is not None and t2 is not None:
+            dwell = dwell[self._mask(t1, t2, "exit")]
+        if not len(dwell):
+            return {q: 0.0 for q in qs}
+        return dict(zip(qs, np.percentile(dwell, qs).tolist()))
+
+    def reprice(self, pricing, t1=None, t2=None):
+        """
+        按新的计价规则批量重算费用（不修改历史）
+        :return: (费用数组, 合计)
+        """
+        enter, exit = self.enter, self.exit
+        if t1 is not None and t2 is not None:
+            mask = self._mask(t1, t2, "exit")
+            enter, exit = enter[mask], exit[mask]
+        fees = pricing.compute(enter, exit)
+        return fees, float(fees.sum())
+
+    def summary(self, t1, t2, period="day", utc_offset_hours=8, active_enter_times=()):
+        """
+        区间内的汇总报表：总收入、车次、按日 / 月收入、峰值占用与停车时长分位数
+        :param active_enter_times: 仍在场车辆的入场时间，计入峰值占用
+        """
+        mask = self._mask(t1, t2, "exit")
+        periods, revenue, counts = self.revenue_by_period(t1, t2, period, utc_offset_hours)
+        peak, peak_time = self.peak_occupancy(t1, t2, active_enter_times)
+        return {
+            "sessions": int(mask.sum()),
+            "revenue": float(self.fee[mask].sum()),
+            "by_" + period: [{"period": p, "revenue": float(r), "sessions": int(c)}
+                             for p, r, c in zip(periods, revenue, counts)],
+            "peak_occupancy": peak,
+            "peak_time": peak_time,
+            "dwell_seconds": self.dwell_percentiles(t1=t1, t2=t2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="停车收入与占用报表")
+    parser.add_argument("db", help="SessionStore 数据库路径，或 SessionHistory.save 保存的 .npz 文件")
+    parser.add_argument("--start", help="起始日期 YYYY-MM-DD（北京时间），默认全部历史")
+    parser.add_argument("--end", help="结束日期 YYYY-MM-DD（不含）")
+    parser.add_argument("--period", choices=["day", "month"], default="month")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    active_enter_times = []  # .npz 只保存已结束的会话
+    if args.db.endswith(".npz"):
+        history = SessionHistory.load(args.db)
+    else:
+        from storage import SessionStore
+        store = SessionStore(args.db)
+        try:
+            history = SessionHistory.from_store(store)
+            active_enter_times = list(store.load_active().values())
+        finally:
+            store.close()
+    loaded = time.perf_counter() - start
+
+    def to_ts(date):
+        return (np.datetime64(date, "s") - np.datetime64(8, "h")).astype(np.int64).astype(float)
+    t1 = to_ts(args.start) if args.start else (float(history.exit.min()) if len(history) else 0.0)
+    t2 = to_ts(args.end) if args.end else (float(history.exit.max()) + 1 if len(history) else 1.0)
+
+    start = time.perf_counter()
+    report = history.summary(t1, t2, args.period, active_enter_times=active_enter_times)
+    elapsed = time.perf_counter() - start
+    print(f"{report['sessions']} 车次，收入 {report['revenue']:.2f} 元，"
+          f"峰值在场 {report['peak_occupancy']} 辆")
+    for row in report["by_" + args.period]:
+        print(f"{row['period']:<12}{row['revenue']:>14.2f}{row['sessions']:>10}")
+    dwell = report["dwell_seconds"]
+    print("停车时长（分钟）：" + "，".join(f"p{q} {v / 60:.1f}" for q, v in dwell.items()))
+    print(f"读取 {loaded:.2f} 秒，报表计算 {elapsed * 1000:.1f} 毫秒")
+
+
+if __name__ == "__main__":
+    main()
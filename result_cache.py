@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+按图像内容寻址的识别结果缓存
+
+- 整图结果：以像素内容哈希为键；可选感知哈希（dHash），相邻几乎相同的抓拍也能命中
+- 车牌级 OCR 结果：以预处理后车牌图像的哈希为键
+- 键中混入命名空间（识别器的模型与参数指纹、OCR 模型名称），更换模型后旧结果（包括磁盘层）不会再命中
+- 内存层为按条目数和字节数双重限制的 LRU，可选 SQLite 磁盘层在重启后继续有效
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(image, namespace=""):
+    """图像像素内容的哈希（包含尺寸与通道数），namespace 区分不同模型配置下的结果。"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(namespace.encode("utf-8") + b"\0")
+    h.update(str(image.shape).encode())
+    h.update(np.ascontiguousarray(image).data)
+    return h.hexdigest()
+
+
+def dhash(image):
+    """差值感知哈希，返回 64 位整数；轻微压缩噪声或亮度变化只会改变少数位。"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class LRUCache:
+    def __init__(self, max_entries=1024, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()  # key: (value, 字节数)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._data[key] = (value, nbytes)
+            self.bytes += nbytes
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, size) = self._data.popitem(last=False)
+                self.bytes -= size
+
+    def items(self):
+        with self._lock:
+            return [(k, v[0]) for k, v in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+
+class DiskCache:
+    def __init__(self, path):
+        """
+        SQLite 磁盘层，值以 pickle 存储
+        :param path: 数据库文件路径
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB)")
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", (key, blob))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Stats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, hit, cost=0.0):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.time_saved += cost
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0,
+                "time_saved": self.time_saved}
+
+
+class RecognitionCache:
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, disk_path=None,
+                 perceptual=False, max_hamming=4, perceptual_window=256, crop_entries=8192):
+        """
+        :param max_entries / max_bytes: 整图结果内存层的条目数与字节数上限
+        :param disk_path: SQLite 磁盘层路径，为 None 时只使用内存
+        :param perceptual: 是否启用感知哈希匹配近似重复的画面
+        :param max_hamming: 感知哈希允许的最大汉明距离
+        :param perceptual_window: 感知哈希只在最近这么多条结果中查找
+        :param crop_entries: 车牌级 OCR 缓存条目数
+        """
+        self.results = LRUCache(max_entries, max_bytes)
+        self.crops = LRUCache(crop_entries, max(max_bytes // 8, 1024 * 1024))
+        self.disk = DiskCache(disk_path) if disk_path else None
+        self.perceptual = perceptual
+        self.max_hamming = max_hamming
+        self._recent_hashes = LRUCache(perceptual_window, 1 << 62)  # (命名空间, dHash): content_key
+        self.result_stats = _Stats()
+        self.crop_stats = _Stats()
+
+    # ---------- 整图结果 ----------
+
+    def lookup(self, image, namespace=""):
+        """
+        查找整图识别结果
+        :param namespace: 识别器配置指纹，见 PlateRecognizer.cache_namespace
+        :return: (key, 缓存的 (结果, 计算耗时) 或 None)
+        """
+        key = content_key(image, namespace)
+        entry = self.results.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get("r:" + key)
+            if entry is not None:
+                self.results.put(key, entry, _result_size(entry[0]))
+        if entry is None and self.perceptual:
+            h = dhash(image)
+            for (other_namespace, other), other_key in self._recent_hashes.items():
+                if other_namespace == namespace and bin(h ^ other).count("1") <= self.max_hamming:
+                    entry = self.results.get(other_key)
+                    if entry is not None:
+                        break
+        self.result_stats.record(entry is not None, entry[1] if entry else 0.0)
+        return key, entry
+
+    def store(self, key, image, result, cost, namespace=""):
+        """保存识别结果；key 与 namespace 为 lookup 时使用的值，result.annotated 不入缓存。"""
+        entry = (result, cost)
+        self.results.put(key, entry, _result_size(result))
+        if self.perceptual:
+            self._recent_hashes.put((namespace, dhash(image)), key, 1)
+        if self.disk is not None:
+            self.disk.put("r:" + key, entry)
+
+    # ---------- 车牌级 OCR 结果 ----------
+
+    def lookup_crop(self, crop, namespace=""):
+        """查找车牌级 OCR 结果，namespace 为 OCR 模型名称。"""
+        key = content_key(crop, namespace)
+        entry = self.crops.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get("c:" + key)
+            if entry is not None:
+                self.crops.put(key, entry, 64)
+        self.crop_stats.record(entry is not None, entry[1] if entry else 0.0)
+        return key, entry
+
+    def store_crop(self, key, output, cost):
+        entry = (output, cost)
+        self.crops.put(key, entry, 64)
+        if self.disk is not None:
+            self.disk.put("c:" + key, entry)
+
+    def stats(self):
+        """命中率与节省的时间（秒）。"""
+        return {"results": self.result_stats.as_dict(), "crops": self.crop_stats.as_dict(),
+                "entries": len(self.results), "bytes": self.results.bytes}
+
+    def log_stats(self, level=logging.INFO):
+        s = self.stats()
+        logger.log(level, "识别缓存：整图命中率 %.1f%%，节省 %.2f 秒；车牌命中率 %.1f%%，节省 %.2f 秒",
+                   s["results"]["hit_ratio"] * 100, s["results"]["time_saved"],
+                   s["crops"]["hit_ratio"] * 100, s["crops"]["time_saved"])
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def _result_size(result):
+    # 估算缓存一条识别结果占用的字节数
+    return 256 + 64 * len(getattr(result, "boxes", ())) + len(getattr(result, "profile", "") or "")
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+车牌识别 HTTP 服务：模型在启动时加载一次，动态批处理器把短时间窗口内的并发请求
+合并为一次 YOLO 批量检测和一次 OCR，队列满时返回 503 让调用方退避重试
+
+    python server.py --port 8080 --max-batch 8 --max-wait-ms 10
+    curl --data-binary @test.jpg http://127.0.0.1:8080/recognize
+
+接口：
+    POST /recognize  请求体为图片文件内容（JPEG / PNG），返回 JSON 识别结果
+    GET  /health     服务状态、队列深度与批处理统计
+    GET  /metrics    Prometheus 文本格式的分阶段延迟
+"""
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from metrics import METRICS
+from models import DEFAULT_FAST_OCR_MODEL, DEFAULT_MODEL_PATH, DEFAULT_OCR_MODEL
+from recognizer import PlateRecognizer
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """请求队列已满。"""
+
+
+class DynamicBatcher:
+    def __init__(self, recognizer, max_batch=8, max_wait=0.01, max_queue=64):
+        """
+        :param recognizer: PlateRecognizer，需提供 recognize_batch
+        :param max_batch: 单批最多合并的请求数
+        :param max_wait: 收到一批中第一个请求后最多再等待的时间（秒）
+        :param max_queue: 排队请求数上限，超过时 submit 抛出 Overloaded
+        """
+        self.recognizer = recognizer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "rejected": 0, "batches": 0, "batched_requests": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def max_queue(self):
+        return self._queue.maxsize
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def submit(self, image):
+        """提交一张 BGR 图像，返回结果为 RecognitionResult 的 Future。"""
+        future = Future()
+        try:
+            self._queue.put_nowait((image, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise Overloaded(f"请求队列已满（{self.max_queue}）")
+        with self._lock:
+            self.stats["requests"] += 1
+        return future
+
+    def _collect(self):
+        # 阻塞等待第一个请求，然后在时间窗口内尽量凑满一批
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            now = time.perf_counter()
+            for _, _, queued in batch:
+                METRICS.observe("queue", now - queued)
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["batched_requests"] += len(batch)
+            try:
+                results = self.recognizer.recognize_batch([image for image, _, _ in batch])
+            except Exception as e:
+                logger.exception("批量识别出错")
+                with self._lock:
+                    self.stats["errors"] += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.depth()
+        stats["max_queue"] = self.max_queue
+        stats["mean_batch_size"] = stats["batched_requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join()
+
+
+class RecognitionHandler(BaseHTTPRequestHandler):
+    server_version = "PlateServer/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status, body, content_type="application/json; charset=utf-8", headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            app = self.server.app
+            self._send(200, {"status": "ok" if app.ready.is_set() else "loading",
+                             "uptime": time.time() - app.started, **app.batcher.snapshot()})
+        elif self.path == "/metrics":
+            self._send(200, self.server.app.prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/recognize":
+            self._send(404, {"error": "not found"})
+            return
+        app = self.server.app
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > app.max_body:
+            self.close_connection = True  # 请求体未读取，连接不能复用
+            self._send(413 if length else 400, {"error": "请求体为空或过大"})
+            return
+        data = self.rfile.read(length)
+
+        with METRICS.timer("request"):
+            with METRICS.timer("decode"):
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                self._send(400, {"error": "无法解码图片"})
+                return
+            try:
+                result = app.batcher.submit(image).result(timeout=app.timeout)
+            except Overloaded as e:
+                self._send(503, {"error": str(e)}, headers={"Retry-After": "1"})
+                return
+            except TimeoutError:
+                self._send(504, {"error": "识别超时"})
+                return
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+        self._send(200, {
+            "plates": result.plates,
+            "texts": result.texts,
+            "raw_texts": result.raw_texts,
+            "scores": result.scores,
+            "boxes": result.boxes,
+            "confidences": result.confidences,
+            "classes": result.classes,
+            "timings": result.timings,
+        })
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # 默认的 listen 积压只有 5，高并发下会直接重置连接
+
+
+class RecognitionServer:
+    def __init__(self, recognizer, host="127.0.0.1", port=8080, max_batch=8, max_wait=0.01,
+                 max_queue=64, timeout=30.0, max_body=10 * 1024 * 1024):
+        """
+        :param recognizer: PlateRecognizer
+        :param timeout: 单个请求等待识别结果的最长时间（秒）
+        :param max_body: 请求体大小上限（字节）
+        """
+        self.batcher = DynamicBatcher(recognizer, max_batch, max_wait, max_queue)
+        self.timeout = timeout
+        self.max_body = max_body
+        self.started = time.time()
+        self.ready = threading.Event()
+        self.httpd = _HTTPServer((host, port), RecognitionHandler)
+        self.httpd.app = self
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def prometheus(self):
+        lines = [METRICS.to_prometheus().rstrip("\n")]
+        stats = self.batcher.snapshot()
+        for key in ("requests", "rejected", "batches", "batched_requests", "errors"):
+            lines.append(f"# TYPE plate_server_{key}_total counter")
+            lines.append(f"plate_server_{key}_total {stats[key]}")
+        lines.append("# TYPE plate_server_queue_depth gauge")
+        lines.append(f"plate_server_queue_depth {stats['queue_depth']}")
+        return "\n".join(lines) + "\n"
+
+    def serve_forever(self):
+        logger.info("识别服务监听 http://%s:%d", *self.address[:2])
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.batcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="车牌识别 HTTP 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="检测模型路径（.pt 或 .onnx）")
+    parser.add_argument("--detector-threads", type=int, default=None, help="ONNX Runtime 检测线程数")
+    parser.add_argument("--ocr-model", default=DEFAULT_OCR_MODEL, help="OCR 模型名称")
+    parser.add_argument("--fast-ocr-model", default=DEFAULT_FAST_OCR_MODEL,
+                        help="级联识别的快速 OCR 模型，传空字符串则只用 --ocr-model")
+    parser.add_argument("--max-batch", type=int, default=8, help="单批最多合并的请求数")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="凑批的最长等待时间（毫秒）")
+    parser.add_argument("--max-queue", type=int, default=64, help="排队请求数上限，超过时返回 503")
+    parser.add_argument("--timeout", type=float, default=30, help="单个请求的超时时间（秒）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    recognizer = PlateRecognizer(args.model, args.ocr_model, args.detector_threads,
+                                 fast_ocr_model=args.fast_ocr_model or None)
+    server = RecognitionServer(recognizer, args.host, args.port, args.max_batch, args.max_wait_ms / 1000,
+                               args.max_queue, args.timeout)
+
+    def load():
+        # 经由批处理线程用空白图像跑一次完整流程加载并预热模型，推理始终只在批处理线程中进行；
+        # 加载期间到达的请求在队列中等待
+        try:
+            server.batcher.submit(np.zeros((640, 640, 3), dtype=np.uint8)).result()
+        except Exception:
+            logger.exception("模型预热失败")
+            return
+        server.ready.set()
+        logger.info("模型加载完成")
+    threading.Thread(target=load, name="model-warmup", daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
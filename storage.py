@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+停车场会话的持久化存储：SQLite（WAL 模式），按车牌、入场时间、出场时间建索引，写入分批提交
+"""
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS active (
+    plate TEXT PRIMARY KEY,
+    enter_time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plate TEXT NOT NULL,
+    enter_time REAL NOT NULL,
+    exit_time REAL NOT NULL,
+    fee REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_plate ON sessions (plate, enter_time);
+CREATE INDEX IF NOT EXISTS idx_sessions_enter ON sessions (enter_time);
+CREATE INDEX IF NOT EXISTS idx_sessions_exit ON sessions (exit_time);
+"""
+
+
+class SessionStore:
+    def __init__(self, db_path="parking.db", batch_size=256, flush_interval=1.0):
+        """
+        :param db_path: 数据库文件路径，":memory:" 表示内存数据库
+        :param batch_size: 累积多少条写操作后提交一次事务
+        :param flush_interval: 距上次提交超过多少秒时也会提交；后台线程按该间隔提交空闲时残留的写操作
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._pending = []  # [(sql, params)]
+        self._last_flush = time.monotonic()
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="session-store-flush", daemon=True)
+        self._flusher.start()
+
+    # ---------- 写入 ----------
+
+    def _flush_periodically(self):
+        # 停车场空闲时没有新的写操作触发提交，由后台线程定时提交，避免未满一批的写操作长时间只在内存中
+        while not self._stop_event.wait(self.flush_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self.flush()
+
+    def _queue(self, sql, params):
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.batch_size or \
+                    time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """提交所有尚未写入的操作。"""
+        with self._lock:
+            if self._pending:
+                with self._conn:
+                    for sql, params in self._pending:
+                        self._conn.execute(sql, params)
+                self._pending = []
+            self._last_flush = time.monotonic()
+
+    def record_enter(self, plate, enter_time):
+        self._queue("INSERT OR REPLACE INTO active (plate, enter_time) VALUES (?, ?)", (plate, enter_time))
+
+    def record_leave(self, plate):
+        self._queue("DELETE FROM active WHERE plate = ?", (plate,))
+
+    def record_session(self, plate, enter_time, exit_time, fee):
+        self._queue("INSERT INTO sessions (plate, enter_time, exit_time, fee) VALUES (?, ?, ?, ?)",
+                    (plate, enter_time, exit_time, fee))
+
+    def close(self):
+        self._stop_event.set()
+        self._flusher.join()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    # ---------- 查询 ----------
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    def load_active(self):
+        """读取在场车辆，返回 {车牌号: 入场时间}。"""
+        return dict(self._query("SELECT plate, enter_time FROM active"))
+
+    def history(self, plate):
+        """查询某车牌的历史记录 [(入场时间, 出场时间, 费用)]。"""
+        return self._query("SELECT enter_time, exit_time, fee FROM sessions "
+                           "WHERE plate = ? ORDER BY enter_time", (plate,))
+
+    def entered_between(self, t1, t2):
+        """入场时间在 [t1, t2) 内的会话 [(车牌号, 入场时间, 出场时间, 费用)]。"""
+        return self._query("SELECT plate, enter_time, exit_time, fee FROM sessions "
+                           "WHERE enter_time >= ? AND enter_time < ? ORDER BY enter_time", (t1, t2))
+
+    def exited_between(self, t1, t2):
+        """出场时间在 [t1, t2) 内的会话 [(车牌号, 入场时间, 出场时间, 费用)]。"""
+        return self._query("SELECT plate, enter_time, exit_time, fee FROM sessions "
+                           "WHERE exit_time >= ? AND exit_time < ? ORDER BY exit_time", (t1, t2))
+
+    def revenue_between(self, t1, t2):
+        """出场时间在 [t1, t2) 内的收入合计。"""
+        row = self._query("SELECT COALESCE(SUM(fee), 0) FROM sessions "
+                          "WHERE exit_time >= ? AND exit_time < ?", (t1, t2))
+        return row[0][0]
+
+    def revenue_by_bucket(self, t1, t2, bucket_seconds=3600):
+        """按出场时间分桶统计收入，返回 [(桶起始时间, 收入, 车次)]，默认按小时。"""
+        return self._query(
+            "SELECT CAST((exit_time - ?) / ? AS INTEGER) * ? + ? AS bucket, SUM(fee), COUNT(*) "
+            "FROM sessions WHERE exit_time >= ? AND exit_time < ? GROUP BY bucket ORDER BY bucket",
+            (t1, bucket_seconds, bucket_seconds, t1, t1, t2))
+
+    def iter_sessions(self, chunk=100000):
+        """
+        按 id 顺序分块读取全部会话，每块为 [(车牌号, 入场时间, 出场时间, 费用)]
+        每块单独查询，只在查询期间持有锁，调用方处理数据时不阻塞写入
+        """
+        last_id = 0
+        while True:
+            rows = self._query("SELECT id, plate, enter_time, exit_time, fee FROM sessions "
+                               "WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk))
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [row[1:] for row in rows]
+
+    def count_sessions(self):
+        return self._query("SELECT COUNT(*) FROM sessions")[0][0]
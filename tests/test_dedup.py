@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from dedup import RecentPlates, nms
+
+
+def test_nms_is_class_agnostic_and_keeps_best():
+    boxes = [[0, 0, 100, 30], [2, 1, 101, 31], [200, 0, 300, 30]]
+    # 前两个框高度重叠（同一车牌被检测为蓝牌和绿牌），保留置信度高的那个，结果按原始顺序
+    assert nms(boxes, [0.6, 0.9, 0.8]) == [1, 2]
+    assert nms(boxes, [0.9, 0.6, 0.8]) == [0, 2]
+
+
+def test_nms_threshold_and_trivial_inputs():
+    boxes = [[0, 0, 10, 10], [5, 0, 15, 10]]  # IoU = 1/3
+    assert nms(boxes, [0.9, 0.8], iou_threshold=0.5) == [0, 1]
+    assert nms(boxes, [0.9, 0.8], iou_threshold=0.3) == [0]
+    assert nms([], []) == []
+    assert nms([[0, 0, 1, 1]], [0.5]) == [0]
+
+
+def test_window_suppresses_and_refreshes():
+    recent = RecentPlates(window=10)
+    assert recent.check("lane1", "京A12345", 0)
+    assert not recent.check("lane1", "京A12345", 5)
+    # 每次出现都刷新时间：距上次 9 秒仍视为重复
+    assert not recent.check("lane1", "京A12345", 14)
+    assert recent.check("lane1", "京A12345", 30)
+    assert recent.check("lane2", "京A12345", 30)  # 车道之间互不影响
+    assert recent.stats == {"passed": 3, "suppressed": 2}
+
+
+def test_expired_and_excess_entries_are_evicted():
+    recent = RecentPlates(window=10, max_entries=2)
+    for i in range(5):
+        recent.check("lane", str(i), i)
+    assert len(recent._seen) == 2
+    assert recent.check("lane", "0", 5)  # 已被淘汰，重新触发
+
+
+def test_forget_allows_retry():
+    recent = RecentPlates(window=10)
+    assert recent.check("enter", "京A12345", 0)
+    recent.forget("enter", "京A12345")
+    assert recent.check("enter", "京A12345", 1)
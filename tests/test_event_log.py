@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import errno
+import threading
+
+import event_log
+from event_log import EventLog
+
+
+def _call_with_timeout(fn, timeout=5.0):
+    # 在子线程中调用，超时视为挂起
+    outcome = {}
+
+    def target():
+        try:
+            outcome["value"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "调用挂起"
+    return outcome
+
+
+def test_append_and_recover(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append_enter("京A12345", 100.0)
+    log.append_enter("京B12345", 110.0)
+    log.append_exit("京A12345", 100.0, 200.0)
+    log.close(snapshot=False)
+
+    log = EventLog(str(tmp_path))
+    assert log.active == {"京B12345": 110.0}
+    assert log.stats["replayed"] == 3
+    log.close()
+
+
+def test_settle_event_keeps_fee_and_active(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append_enter("京A12345", 100.0)
+    log.append_exit("京A12345", 100.0, 3700.0)
+    log.append_enter("京A12345", 4000.0)
+    log.append_settle("京A12345", 100.0, 3700.0, 5.0)
+    log.close(snapshot=False)
+
+    with open(next(tmp_path.glob("events-*.log")), encoding="utf-8") as f:
+        assert f.read().splitlines()[-1] == "S\t4\t京A12345\t100.0\t3700.0\t5.0"
+    log = EventLog(str(tmp_path))
+    assert log.active == {"京A12345": 4000.0}  # 结算事件不影响在场车辆
+    log.close()
+
+
+def test_write_error_is_raised_instead_of_hanging(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path))
+    log.append_enter("京A12345", 100.0)
+
+    def failing_fsync(fd):
+        raise OSError(errno.EIO, "injected I/O error")
+    monkeypatch.setattr(event_log.os, "fsync", failing_fsync)
+
+    outcome = _call_with_timeout(lambda: log.append_enter("京B12345", 110.0))
+    assert isinstance(outcome.get("error"), OSError)
+    # 失败之后的追加、flush 与 close 都立即抛出同一个错误
+    for call in (lambda: log.append_enter("京C12345", 120.0), log.flush, log.close):
+        outcome = _call_with_timeout(call)
+        assert isinstance(outcome.get("error"), OSError)
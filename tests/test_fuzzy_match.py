@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from fuzzy_match import FuzzyPlateIndex, weighted_edit_distance
+from parking import ParkingLot
+
+
+def test_confusable_substitution_is_cheaper():
+    assert weighted_edit_distance("京A12345", "京A12345") == 0.0
+    assert weighted_edit_distance("京A1234S", "京A12345") == 0.3
+    assert weighted_edit_distance("京A12349", "京A12345") == 1.0
+    assert weighted_edit_distance("京A1234", "京A12345") == 1.0
+
+
+def test_exact_and_confusable_match():
+    index = FuzzyPlateIndex()
+    index.add("京A12345")
+    assert index.match("京A12345") == ("京A12345", 0.0)
+    assert index.match("京A1234S") == ("京A12345", 0.3)
+    assert index.match("京A12349") == (None, None)  # 普通替换超过默认阈值
+    assert index.match("") == (None, None)
+
+
+def test_tie_returns_none():
+    index = FuzzyPlateIndex()
+    index.add("京A1234S")
+    index.add("京A1Z345")
+    # 与两个在场车牌的距离都是一处易混淆替换，无法判断是哪一辆
+    assert index.match("京A12345") == (None, None)
+    index.remove("京A1Z345")
+    assert index.match("京A12345") == ("京A1234S", 0.3)
+
+
+def test_confidence_scales_allowed_distance():
+    index = FuzzyPlateIndex(max_distance=0.7, confidence_weight=0.6)
+    index.add("京A12345")
+    assert index.allowed_distance(None) == 0.7
+    assert abs(index.allowed_distance(1.0) - 0.28) < 1e-9
+    assert index.allowed_distance(5.0) == index.allowed_distance(1.0)  # 置信度截断到 [0, 1]
+    # 两处易混淆替换（0.6）：低置信度时接受，高置信度时拒绝
+    assert index.match("京A1Z34S", confidence=0.1)[0] == "京A12345"
+    assert index.match("京A1Z34S", confidence=0.99) == (None, None)
+
+
+def test_remove():
+    index = FuzzyPlateIndex()
+    index.add("京A12345")
+    index.remove("京A12345")
+    index.remove("京A12345")
+    assert len(index) == 0
+    assert index.match("京A1234S") == (None, None)
+
+
+def test_parking_lot_uses_empty_index_by_default():
+    class NoRecognizer:
+        pass
+    lot = ParkingLot(recognizer=NoRecognizer())
+    assert lot.fuzzy_index is not None
+    lot.check_in("京A12345", 100.0)
+    assert lot.match_plate("京A1234S") == "京A12345"
+    assert ParkingLot(recognizer=NoRecognizer(), fuzzy_index=False).fuzzy_index is None
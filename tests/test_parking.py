@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from parking import ParkingLot
+
+
+class _NoRecognizer:
+    pass
+
+
+class _RecordingLog:
+    def __init__(self):
+        self.active = {}
+        self.events = []
+
+    def append_enter(self, plate, enter_time, wait=True):
+        self.events.append(("enter", plate, enter_time))
+
+    def append_exit(self, plate, enter_time, exit_time, wait=True):
+        self.events.append(("exit", plate, enter_time, exit_time))
+
+    def append_settle(self, plate, enter_time, exit_time, fee, wait=True):
+        self.events.append(("settle", plate, enter_time, exit_time, fee))
+
+
+def test_duplicate_check_in_with_identical_timestamp():
+    log = _RecordingLog()
+    lot = ParkingLot(recognizer=_NoRecognizer(), event_log=log)
+    enter_time = 100
+    assert lot.check_in("京A12345", enter_time) == 100
+    assert lot.check_in("京A12345", enter_time) is None
+    assert log.events == [("enter", "京A12345", 100)]
+
+
+def test_settle_records_fee_after_exit():
+    log = _RecordingLog()
+    lot = ParkingLot(hourly_rate=4, recognizer=_NoRecognizer(), event_log=log)
+    lot.check_in("京A12345", 0.0)
+    _, enter_time, exit_time = lot.check_out("京A12345", 5400.0)
+    assert lot.settle("京A12345", enter_time, exit_time) == 6.0
+    assert log.events[1:] == [("exit", "京A12345", 0.0, 5400.0), ("settle", "京A12345", 0.0, 5400.0, 6.0)]
+
+
+def test_concurrent_check_in_registers_once():
+    log = _RecordingLog()
+    lot = ParkingLot(recognizer=_NoRecognizer(), event_log=log)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def gate():
+        barrier.wait()
+        results.append(lot.check_in("京A12345", 100.0))
+    threads = [threading.Thread(target=gate) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(r is not None for r in results) == 1
+    assert len(log.events) == 1
+
+
+class _FailingLog(_RecordingLog):
+    def __init__(self):
+        super().__init__()
+        self.fail = False
+
+    def append_enter(self, plate, enter_time, wait=True):
+        if self.fail:
+            raise OSError("disk full")
+        super().append_enter(plate, enter_time, wait)
+
+    def append_exit(self, plate, enter_time, exit_time, wait=True):
+        if self.fail:
+            raise OSError("disk full")
+        super().append_exit(plate, enter_time, exit_time, wait)
+
+
+def test_failed_check_in_is_rolled_back():
+    log = _FailingLog()
+    lot = ParkingLot(recognizer=_NoRecognizer(), event_log=log)
+    log.fail = True
+    with pytest.raises(OSError):
+        lot.check_in("京A12345", 100.0)
+    assert "京A12345" not in lot.active_vehicles
+    assert lot.match_plate("京A1234S") is None  # 近似匹配索引也已撤销
+    log.fail = False
+    assert lot.check_in("京A12345", 101.0) == 101.0
+
+
+def test_failed_check_out_keeps_vehicle_inside():
+    log = _FailingLog()
+    lot = ParkingLot(recognizer=_NoRecognizer(), event_log=log)
+    lot.check_in("京A12345", 100.0)
+    log.fail = True
+    with pytest.raises(OSError):
+        lot.check_out("京A12345", 200.0)
+    assert lot.active_vehicles == {"京A12345": 100.0}
+    log.fail = False
+    assert lot.check_out("京A12345", 300.0) == ("京A12345", 100.0, 300.0)
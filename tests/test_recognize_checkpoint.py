@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import os
+
+from recognize import ResultWriter, load_checkpoint
+
+
+def _record(path):
+    return {"path": path, "texts": ["京A12345"], "raw_texts": ["京A12345"], "scores": [0.99],
+            "confidences": [0.9], "boxes": [[1.0, 2.0, 3.0, 4.0]]}
+
+
+def _resume_after_truncation(tmp_path, fmt):
+    output = str(tmp_path / f"results.{fmt}")
+    writer = ResultWriter(output, fmt)
+    writer.write(_record("a.jpg"))
+    writer.write(_record("b.jpg"))
+    writer.close()
+    # 模拟写 b.jpg 这一行时中断：只保留到 path 字段之后
+    with open(output, "rb") as f:
+        data = f.read()
+    cut = data.rindex(b"b.jpg") + len(b"b.jpg") + 3
+    with open(output, "wb") as f:
+        f.write(data[:cut])
+
+    done = load_checkpoint(output, fmt)
+    assert done == {"a.jpg"}
+
+    writer = ResultWriter(output, fmt)
+    writer.write(_record("b.jpg"))
+    writer.close()
+    assert load_checkpoint(output, fmt) == {"a.jpg", "b.jpg"}
+    with open(output, "rb") as f:
+        assert f.read().endswith(b"\n")
+    return output
+
+
+def test_resume_truncated_csv(tmp_path):
+    output = _resume_after_truncation(tmp_path, "csv")
+    with open(output, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("path,") and len(lines) == 3
+
+
+def test_resume_truncated_jsonl(tmp_path):
+    output = _resume_after_truncation(tmp_path, "jsonl")
+    with open(output, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 2
+
+
+def test_missing_output(tmp_path):
+    assert load_checkpoint(os.path.join(str(tmp_path), "none.csv"), "csv") == set()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from reports import SessionHistory, TieredPricing
+
+HOUR = 3600
+
+
+def test_default_pricing_is_linear():
+    assert TieredPricing().fee(0, 1.5 * HOUR) == 7.5
+
+
+def test_tiers_free_minutes_and_daily_cap():
+    pricing = TieredPricing(tiers=((1, 8.0), (4, 5.0), (None, 3.0)), free_minutes=15, daily_cap=60)
+    assert pricing.fee(0, 15 * 60) == 0.0               # 免费时长内
+    assert pricing.fee(0, 30 * 60) == 4.0               # 第一段
+    assert pricing.fee(0, 6 * HOUR) == 8 + 3 * 5 + 2 * 3
+    assert pricing.fee(0, 24 * HOUR) == 60.0            # 8 + 15 + 60 = 83，按日封顶
+    assert pricing.fee(0, 30 * HOUR) == 60 + 29.0       # 满一天封顶 + 余下 6 小时
+    assert pricing.fee(100, 0) == 0.0                   # 出场早于入场按 0 计
+    fees = pricing.compute([0, 0], [30 * 60, 6 * HOUR])
+    assert fees.tolist() == [4.0, 29.0]
+
+
+def _history():
+    history = SessionHistory(capacity=2)  # 容量不足时自动扩容
+    history.append("京A12345", 0, 2 * HOUR, 10.0)
+    history.append("京B12345", 1 * HOUR, 3 * HOUR, 10.0)
+    history.extend(["京A12345", "京C12345"], [25 * HOUR, 26 * HOUR], [26 * HOUR, 27 * HOUR], [5.0, 5.0])
+    return history
+
+
+def test_history_columns_and_sessions_of():
+    history = _history()
+    assert len(history) == 4
+    assert history.fee.tolist() == [10.0, 10.0, 5.0, 5.0]
+    assert [enter for enter, _, _ in history.sessions_of("京A12345")] == [0, 25 * HOUR]
+    assert history.sessions_of("京Z99999") == []
+
+
+def test_revenue_by_bucket_and_period():
+    history = _history()
+    starts, revenue, counts = history.revenue_by_bucket(0, 48 * HOUR, 24 * HOUR)
+    assert starts.tolist() == [0, 24 * HOUR]
+    assert revenue.tolist() == [20.0, 10.0]
+    assert counts.tolist() == [2, 2]
+    periods, revenue, counts = history.revenue_by_period(0, 48 * HOUR, "day", utc_offset_hours=0)
+    assert list(periods) == ["1970-01-01", "1970-01-02"]
+    assert revenue.tolist() == [20.0, 10.0]
+    assert counts.tolist() == [2, 2]
+
+
+def test_peak_occupancy_and_active_vehicles():
+    history = _history()
+    assert history.peak_occupancy() == (2, 1 * HOUR)
+    # 出场与入场在同一时刻时先出后入：26 小时时京A出场、京C入场，在场数不超过 1
+    assert history.peak_occupancy(24 * HOUR, 48 * HOUR)[0] == 1
+    # 仍在场的车辆计入占用
+    assert history.peak_occupancy(24 * HOUR, 48 * HOUR, active_enter_times=[20 * HOUR])[0] == 2
+    assert history.occupancy_at([1.5 * HOUR, 10 * HOUR]).tolist() == [2, 0]
+
+
+def test_summary_counts_active_vehicles():
+    history = _history()
+    report = history.summary(0, 48 * HOUR, "day", utc_offset_hours=0)
+    assert report["sessions"] == 4
+    assert report["revenue"] == 30.0
+    assert report["peak_occupancy"] == 2
+    report = history.summary(0, 48 * HOUR, "day", utc_offset_hours=0,
+                             active_enter_times=[0.5 * HOUR, 0.5 * HOUR])
+    assert report["peak_occupancy"] == 4
+    assert np.isclose(report["dwell_seconds"][50], HOUR * 1.5)
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    history = _history()
+    path = str(tmp_path / "history.npz")
+    history.save(path)
+    loaded = SessionHistory.load(path)
+    assert len(loaded) == 4
+    assert loaded.enter.tolist() == history.enter.tolist()
+    assert loaded.sessions_of("京C12345") == history.sessions_of("京C12345")
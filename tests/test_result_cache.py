@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import numpy as np
+
+from result_cache import LRUCache, RecognitionCache, content_key, dhash
+
+
+def _image(seed, shape=(64, 96, 3)):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def _result(*texts):
+    return SimpleNamespace(texts=list(texts), boxes=[[0, 0, 1, 1]] * len(texts), profile=None)
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    cache = LRUCache(max_entries=2, max_bytes=100)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.put("c", 3, 10)
+    assert cache.get("b") is None and len(cache) == 2
+
+    cache.put("d", 4, 95)  # 超出字节上限，依次淘汰最久未使用的条目
+    assert cache.get("a") is None and cache.get("c") is None and cache.get("d") == 4
+    assert cache.bytes == 95
+    cache.put("e", 5, 1000)  # 单条超过上限时不缓存
+    assert cache.get("e") is None and cache.bytes == 95
+    cache.put("d", 6, 5)  # 覆盖时扣除旧条目的字节数
+    assert cache.bytes == 5 and cache.get("d") == 6
+
+
+def test_content_key_depends_on_pixels_shape_and_namespace():
+    image = _image(0)
+    assert content_key(image) == content_key(image.copy())
+    assert content_key(image) != content_key(image.reshape(96, 64, 3))
+    assert content_key(image, "model-a") != content_key(image, "model-b")
+    changed = image.copy()
+    changed[0, 0, 0] ^= 1
+    assert content_key(image) != content_key(changed)
+
+
+def test_results_are_isolated_by_namespace():
+    cache = RecognitionCache()
+    image = _image(1)
+    key, entry = cache.lookup(image, "model-a")
+    assert entry is None
+    cache.store(key, image, _result("京A12345"), 0.5, "model-a")
+    assert cache.lookup(image, "model-a")[1][0].texts == ["京A12345"]
+    assert cache.lookup(image, "model-b")[1] is None
+    stats = cache.stats()["results"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["time_saved"] == 0.5
+
+
+def test_perceptual_match_within_namespace():
+    cache = RecognitionCache(perceptual=True, max_hamming=4)
+    image = np.tile(np.linspace(0, 255, 96, dtype=np.uint8), (64, 1))[:, :, None].repeat(3, axis=2)
+    near = image.copy()
+    near[0, 0] += 1  # 像素哈希不同，感知哈希基本不变
+    assert bin(dhash(image) ^ dhash(near)).count("1") <= 4
+    key, _ = cache.lookup(image, "model-a")
+    cache.store(key, image, _result("京A12345"), 0.2, "model-a")
+    assert cache.lookup(near, "model-a")[1] is not None
+    assert cache.lookup(near, "model-b")[1] is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = RecognitionCache(disk_path=path)
+    image, crop = _image(2), _image(3, (32, 128, 3))
+    key, _ = cache.lookup(image, "model-a")
+    cache.store(key, image, _result("京A12345"), 0.5, "model-a")
+    crop_key, _ = cache.lookup_crop(crop, "ocr-a")
+    cache.store_crop(crop_key, ("京A12345", 0.99), 0.1)
+    cache.close()
+
+    cache = RecognitionCache(disk_path=path)
+    assert cache.lookup(image, "model-a")[1][0].texts == ["京A12345"]
+    assert cache.lookup(image, "model-b")[1] is None
+    assert cache.lookup_crop(crop, "ocr-a")[1] == (("京A12345", 0.99), 0.1)
+    assert cache.lookup_crop(crop, "ocr-b")[1] is None
+    assert len(cache.results) == 1  # 磁盘命中后回填内存层
+    cache.close()
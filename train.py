@@ -1,14 +1,54 @@
+import argparse
 
 from ultralytics import YOLO
 
+
+def make_packed_trainer(pack_root):
+    """构造从 utils/pack_dataset.py 生成的内存映射缓存读取数据的训练器。"""
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    from ultralytics.utils import colorstr
+    from ultralytics.utils.torch_utils import de_parallel
+    from utils.pack_dataset import make_packed_yolo_dataset
+
+    dataset_cls = make_packed_yolo_dataset(pack_root)
+
+    class PackedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+            return dataset_cls(
+                img_path=img_path,
+                imgsz=self.args.imgsz,
+                batch_size=batch,
+                augment=mode == "train",
+                hyp=self.args,
+                rect=self.args.rect or mode == "val",
+                cache=None,
+                single_cls=self.args.single_cls or False,
+                stride=gs,
+                pad=0.0 if mode == "train" else 0.5,
+                prefix=colorstr(f"{mode}: "),
+                task=self.args.task,
+                classes=self.args.classes,
+                data=self.data,
+                fraction=self.args.fraction if mode == "train" else 1.0,
+            )
+
+    return PackedDetectionTrainer
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packed', help='utils/pack_dataset.py 的输出目录，指定后从打包缓存读取训练数据')
+    args = parser.parse_args()
+
     model = YOLO('yolov8n.pt')
     model.train(
         data='data.yaml',
         epochs=50,
         imgsz=640,
         batch=16,
-        device=0
+        device=0,
+        trainer=make_packed_trainer(args.packed) if args.packed else None
     )
 
 if __name__ == '__main__':
@@ -2,10 +2,12 @@
 
 import os
 import re
-import cv2
+import json
 import shutil
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
+from PIL import Image
 from tqdm import tqdm
 
 # 配置日志
@@ -57,73 +59,136 @@ class YOLOFormatConverter:
                 result.append(apath)
         return result
 
-    def convert(self):
+    @staticmethod
+    def parse_bbox(name):
+        """
+        从 CCPD 文件名中解析车牌外接矩形
+        :param name: 图片路径
+        :return: (x0, y0, x1, y1)
+        """
+        str1 = re.findall(r'-\d+\&\d+_\d+\&\d+-', name)[0][1:-1]
+        str2 = re.split(r'\&|_', str1)
+        return int(str2[0]), int(str2[1]), int(str2[2]), int(str2[3])
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.save_path, f".{self.prefix}_manifest.json")
+
+    def build_plan(self):
+        """
+        生成转换计划：每个子集内按文件名排序后确定输出序号，与处理顺序和并行度无关
+        :return: [(源路径, 目标图片路径, 目标标签路径)]
+        """
+        images_files = self.list_path_all_files(self.data_path)
+        logging.info(f"找到 {len(images_files)} 个文件")
+        subsets = {}
+        for name in images_files:
+            if name.endswith(".jpg") or name.endswith(".png"):
+                # 确定当前文件属于哪个子集（test/train/val）
+                subset = os.path.basename(os.path.dirname(name))
+                subsets.setdefault(subset, []).append(name)
+
+        plan = []
+        for subset, names in sorted(subsets.items()):
+            images_save_path = os.path.join(self.save_path, subset, "images")
+            labels_save_path = os.path.join(self.save_path, subset, "labels")
+            os.makedirs(images_save_path, exist_ok=True)
+            os.makedirs(labels_save_path, exist_ok=True)
+            for index, name in enumerate(sorted(names), 1):
+                stem = f"{self.prefix}_{str(index).zfill(6)}"
+                _, extension = os.path.splitext(name)
+                plan.append((name,
+                             os.path.join(images_save_path, stem + extension),
+                             os.path.join(labels_save_path, stem + ".txt")))
+        return plan
+
+    def load_or_build_plan(self, resume=True):
+        """读取上次中断时留下的转换计划，不存在时生成新计划并先写入清单文件。"""
+        if resume and os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            logging.info(f"从清单继续转换: {self.manifest_path}")
+            return [tuple(entry) for entry in manifest["entries"]]
+
+        plan = self.build_plan()
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"data_path": self.data_path, "class_id": self.class_id, "entries": plan},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+        return plan
+
+    def convert(self, workers=None, resume=True):
         """
         将数据集转换为YOLO格式
+        :param workers: 进程数，默认等于 CPU 核数
+        :param resume: 存在上次中断留下的清单时从中断处继续
         """
         try:
-            # 获取所有图片文件路径
-            images_files = self.list_path_all_files(self.data_path)
-            logging.info(f"找到 {len(images_files)} 个文件")
-
-            # 初始化计数器
-            cnt = {"test": 1, "train": 1, "val": 1}
-
-            # 遍历所有图片文件
-            for name in tqdm(images_files, desc="转换进度"):
-                if name.endswith(".jpg") or name.endswith(".png"):
-                    # 确定当前文件属于哪个子集（test/train/val）
-                    subset = os.path.basename(os.path.dirname(name))
-
-                    # 读取图片
-                    img = cv2.imread(name)
-                    if img is None:
-                        logging.warning(f"无法读取图片: {name}")
-                        continue
-
-                    # 获取图片的高度和宽度
-                    height, width = img.shape[0], img.shape[1]
-
-                    # 使用正则表达式从文件名中提取坐标信息
-                    try:
-                        str1 = re.findall(r'-\d+\&\d+_\d+\&\d+-', name)[0][1:-1]
-                        str2 = re.split(r'\&|_', str1)
-                        x0 = int(str2[0])
-                        y0 = int(str2[1])
-                        x1 = int(str2[2])
-                        y1 = int(str2[3])
-                    except Exception as e:
-                        logging.error(f"解析文件名时出错: {name}, 错误: {e}")
-                        continue
-
-                    # 计算边界框的中心点坐标以及宽度和高度，并进行归一化
-                    x = round((x0 + x1) / 2 / width, 6)
-                    y = round((y0 + y1) / 2 / height, 6)
-                    w = round((x1 - x0) / width, 6)
-                    h = round((y1 - y0) / height, 6)
-
-                    # 构建保存路径
-                    images_save_path = os.path.join(self.save_path, subset, "images")
-                    labels_save_path = os.path.join(self.save_path, subset, "labels")
-
-                    txtfile = os.path.join(labels_save_path, f"{self.prefix}_{str(cnt[subset]).zfill(6)}.txt")
-                    _, extension = os.path.splitext(name)
-                    imgfile = os.path.join(images_save_path, f"{self.prefix}_{str(cnt[subset]).zfill(6)}{extension}")
-                    # 写入标签文件
-                    with open(txtfile, "w") as f:
-                        f.write(" ".join([str(self.class_id), str(x), str(y), str(w), str(h)]))
-
-                    # 移动图片到新位置
-                    shutil.move(name, imgfile)
-
-                    # 更新计数器
-                    cnt[subset] += 1
-
-            logging.info(f"转换完成，共处理 {sum(cnt.values()) - 3} 张图片")
+            plan = self.load_or_build_plan(resume)
+            counts = {"done": 0, "skipped": 0, "failed": 0}
+            with ProcessPoolExecutor(workers) as executor:
+                jobs = executor.map(convert_one, plan, [self.class_id] * len(plan), chunksize=256)
+                for status, name, message in tqdm(jobs, total=len(plan), desc="转换进度"):
+                    counts[status] += 1
+                    if status == "failed":
+                        logging.warning(f"{message}: {name}")
+
+            logging.info(f"转换完成，共处理 {counts['done']} 张图片，"
+                         f"跳过已完成 {counts['skipped']} 张，失败 {counts['failed']} 张")
+            if counts["failed"] == 0:
+                os.remove(self.manifest_path)
         except Exception as e:
             logging.error(f"转换过程中出错: {e}")
             raise
 
+
+def read_image_size(path):
+    """只读取图片文件头获取 (宽, 高)，不解码像素。"""
+    with Image.open(path) as img:
+        return img.size
+
+
+def convert_one(entry, class_id):
+    """
+    转换单张图片：写标签、移动图片
+    :return: (状态, 源路径, 说明)，状态为 done / skipped / failed
+    """
+    name, imgfile, txtfile = entry
+    # 源文件已不存在而目标存在，说明上次运行中已经移动完成
+    if not os.path.exists(name):
+        if os.path.exists(imgfile) and os.path.exists(txtfile):
+            return "skipped", name, ""
+        return "failed", name, "源文件不存在"
+
+    try:
+        width, height = read_image_size(name)
+    except Exception as e:
+        return "failed", name, f"无法读取图片: {e}"
+
+    # 使用正则表达式从文件名中提取坐标信息
+    try:
+        x0, y0, x1, y1 = YOLOFormatConverter.parse_bbox(name)
+    except Exception as e:
+        return "failed", name, f"解析文件名时出错: {e}"
+
+    # 计算边界框的中心点坐标以及宽度和高度，并进行归一化
+    x = round((x0 + x1) / 2 / width, 6)
+    y = round((y0 + y1) / 2 / height, 6)
+    w = round((x1 - x0) / width, 6)
+    h = round((y1 - y0) / height, 6)
+
+    # 先写标签（临时文件 + 原子替换），再移动图片；中断后重跑时两步都可以安全重做
+    tmp_txt = txtfile + ".tmp"
+    with open(tmp_txt, "w") as f:
+        f.write(" ".join([str(class_id), str(x), str(y), str(w), str(h)]))
+    os.replace(tmp_txt, txtfile)
+
+    # 移动图片到新位置
+    shutil.move(name, imgfile)
+    return "done", name, ""
+
+
 if __name__ == '__main__':
     # 转换蓝牌数据（class_id=0）
     blue_converter = YOLOFormatConverter(
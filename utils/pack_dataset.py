@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+将 convert2YOLO.py 生成的 YOLO 数据集打包为可内存映射的训练缓存
+
+每个子集（train/val/test）打包为一个目录：
+    shard_00000.bin ...  预先 letterbox 到 imgsz×imgsz 的原始 BGR 像素，按固定大小依次存放
+    index.npy            每张图片的 (分片号, 字节偏移, 原始高, 原始宽, 标签起始行, 标签行数)
+    labels.npy           所有标签 [类别, x, y, w, h]，坐标已换算到 letterbox 后的图像并归一化
+    files.json           源图片路径及其 (大小, 修改时间)，用于增量打包
+
+训练时按偏移直接映射像素，省去打开文件与 JPEG 解码；新增图片时只追加新数据
+
+    python pack_dataset.py ../dataset ../dataset/packed --imgsz 640
+"""
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+INDEX_DTYPE = np.dtype([
+    ("shard", np.uint32), ("offset", np.uint64), ("h0", np.uint32), ("w0", np.uint32),
+    ("label_start", np.uint64), ("label_count", np.uint32),
+])
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def letterbox(image, size, color=(114, 114, 114)):
+    # 等比缩放并填充到 size×size，返回 (图像, 缩放比例, (左填充, 上填充))
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    left, top = (size - new_w) // 2, (size - new_h) // 2
+    image = cv2.copyMakeBorder(image, top, size - new_h - top, left, size - new_w - left,
+                               cv2.BORDER_CONSTANT, value=color)
+    return image, scale, (left, top)
+
+
+def label_path_for(image_path):
+    # YOLO 约定：.../images/xxx.jpg 对应 .../labels/xxx.txt
+    head, name = os.path.split(image_path)
+    return os.path.join(os.path.dirname(head), "labels", os.path.splitext(name)[0] + ".txt")
+
+
+def read_labels(label_path):
+    if not os.path.exists(label_path):
+        return np.zeros((0, 5), dtype=np.float32)
+    labels = np.loadtxt(label_path, dtype=np.float32, ndmin=2)
+    return labels[:, :5] if labels.size else np.zeros((0, 5), dtype=np.float32)
+
+
+def prepare(image_path, imgsz):
+    """读取并 letterbox 一张图片，同时换算标签；无法读取时返回 None。"""
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    h0, w0 = image.shape[:2]
+    padded, scale, (left, top) = letterbox(image, imgsz)
+    labels = read_labels(label_path_for(image_path))
+    if len(labels):
+        labels = labels.copy()
+        labels[:, 1] = (labels[:, 1] * w0 * scale + left) / imgsz
+        labels[:, 2] = (labels[:, 2] * h0 * scale + top) / imgsz
+        labels[:, 3] = labels[:, 3] * w0 * scale / imgsz
+        labels[:, 4] = labels[:, 4] * h0 * scale / imgsz
+    return np.ascontiguousarray(padded), (h0, w0), labels
+
+
+def file_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class PackedDataset:
+    def __init__(self, pack_dir):
+        """
+        内存映射方式读取打包后的子集
+        :param pack_dir: 某个子集的打包目录
+        """
+        self.pack_dir = pack_dir
+        with open(os.path.join(pack_dir, "files.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.imgsz = meta["imgsz"]
+        self.files = meta["files"]
+        self.index = np.load(os.path.join(pack_dir, "index.npy"))
+        self.all_labels = np.load(os.path.join(pack_dir, "labels.npy"))
+        self.image_bytes = self.imgsz * self.imgsz * 3
+        self._shards = {}  # 分片号: np.memmap，按需打开（DataLoader 子进程各自打开）
+
+    def __len__(self):
+        return len(self.files)
+
+    def _shard(self, shard):
+        mm = self._shards.get(shard)
+        if mm is None:
+            path = os.path.join(self.pack_dir, f"shard_{shard:05d}.bin")
+            mm = self._shards[shard] = np.memmap(path, dtype=np.uint8, mode="r")
+        return mm
+
+    def image(self, i):
+        """返回第 i 张 letterbox 后的 BGR 图像（只读内存映射视图）。"""
+        entry = self.index[i]
+        offset = int(entry["offset"])
+        data = self._shard(int(entry["shard"]))[offset:offset + self.image_bytes]
+        return data.reshape(self.imgsz, self.imgsz, 3)
+
+    def labels(self, i):
+        """返回第 i 张图片的标签 [类别, x, y, w, h]（相对 letterbox 后图像归一化）。"""
+        entry = self.index[i]
+        start = int(entry["label_start"])
+        return self.all_labels[start:start + int(entry["label_count"])]
+
+    def original_shape(self, i):
+        entry = self.index[i]
+        return int(entry["h0"]), int(entry["w0"])
+
+
+def pack_subset(images_dir, pack_dir, imgsz=640, shard_size=1024, workers=8):
+    """
+    打包一个子集；pack_dir 中已有缓存时只追加新增或修改过的图片，已删除的图片从索引中移除
+    :param images_dir: 子集的 images 目录
+    :param shard_size: 每个分片存放的图片数
+    :return: 本次新写入的图片数
+    """
+    os.makedirs(pack_dir, exist_ok=True)
+    files_path = os.path.join(pack_dir, "files.json")
+    files, stamps = [], []
+    index = np.zeros(0, dtype=INDEX_DTYPE)
+    labels = np.zeros((0, 5), dtype=np.float32)
+    if os.path.exists(files_path):
+        with open(files_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["imgsz"] != imgsz:
+            raise ValueError(f"已有缓存的 imgsz 为 {meta['imgsz']}，与 {imgsz} 不一致，请删除 {pack_dir} 后重建")
+        files, stamps = meta["files"], meta["stamps"]
+        index = np.load(os.path.join(pack_dir, "index.npy"))
+        labels = np.load(os.path.join(pack_dir, "labels.npy"))
+
+    with os.scandir(images_dir) as entries:
+        current = sorted(os.path.abspath(e.path) for e in entries if e.name.lower().endswith(IMAGE_EXTENSIONS))
+    current_set = set(current)
+
+    # 保留未变化的条目，新增或修改过的图片需要重新打包
+    keep = [i for i, path in enumerate(files) if path in current_set and file_stamp(path) == stamps[i]]
+    kept = set(files[i] for i in keep)
+    todo = [path for path in current if path not in kept]
+    if len(keep) != len(files):
+        logging.info(f"移除 {len(files) - len(keep)} 条过期索引（分片中的旧数据保留，重建可回收空间）")
+    files = [files[i] for i in keep]
+    stamps = [stamps[i] for i in keep]
+    index = index[keep]
+    label_chunks = [labels[int(e["label_start"]):int(e["label_start"]) + int(e["label_count"])] for e in index]
+
+    image_bytes = imgsz * imgsz * 3
+    # 追加到最后一个分片的末尾，分片写满后新建
+    shard = 0
+    count_in_shard = 0
+    while os.path.exists(os.path.join(pack_dir, f"shard_{shard + 1:05d}.bin")):
+        shard += 1
+    shard_path = os.path.join(pack_dir, f"shard_{shard:05d}.bin")
+    if os.path.exists(shard_path):
+        count_in_shard = os.path.getsize(shard_path) // image_bytes
+        # 上次中断时可能只写了半张图片，截掉不完整的尾部，保证偏移量是图片大小的整数倍
+        os.truncate(shard_path, count_in_shard * image_bytes)
+
+    new_entries = []
+    written = 0
+    out = open(shard_path, "ab")
+    try:
+        with ThreadPoolExecutor(workers) as executor:
+            for path, prepared in tqdm(zip(todo, executor.map(lambda p: prepare(p, imgsz), todo)),
+                                       total=len(todo), desc=os.path.basename(pack_dir)):
+                if prepared is None:
+                    logging.warning(f"无法读取图片: {path}")
+                    continue
+                if count_in_shard >= shard_size:
+                    out.close()
+                    shard += 1
+                    count_in_shard = 0
+                    out = open(os.path.join(pack_dir, f"shard_{shard:05d}.bin"), "ab")
+                image, (h0, w0), image_labels = prepared
+                offset = out.tell()
+                out.write(image.tobytes())
+                count_in_shard += 1
+                files.append(path)
+                stamps.append(file_stamp(path))
+                new_entries.append((shard, offset, h0, w0, 0, len(image_labels)))
+                label_chunks.append(image_labels)
+                written += 1
+    finally:
+        out.close()
+
+    index = np.concatenate([index, np.array(new_entries, dtype=INDEX_DTYPE)])
+    counts = index["label_count"].astype(np.uint64)
+    index["label_start"] = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.uint64) if len(index) else counts
+    labels = np.concatenate(label_chunks) if label_chunks else np.zeros((0, 5), dtype=np.float32)
+
+    # 先写数据后写索引，中断时旧索引仍然有效
+    np.save(os.path.join(pack_dir, "index.npy.tmp.npy"), index)
+    np.save(os.path.join(pack_dir, "labels.npy.tmp.npy"), labels.astype(np.float32))
+    os.replace(os.path.join(pack_dir, "labels.npy.tmp.npy"), os.path.join(pack_dir, "labels.npy"))
+    os.replace(os.path.join(pack_dir, "index.npy.tmp.npy"), os.path.join(pack_dir, "index.npy"))
+    tmp_path = files_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"imgsz": imgsz, "files": files, "stamps": stamps}, f, ensure_ascii=False)
+    os.replace(tmp_path, files_path)
+    logging.info(f"{pack_dir}: 新增 {written} 张，共 {len(files)} 张")
+    return written
+
+
+def make_packed_yolo_dataset(pack_root):
+    """
+    构造读取打包缓存的 ultralytics YOLODataset 子类；img_path 的目录名（train/val/test）对应 pack_root 下的子目录
+    """
+    from ultralytics.data.dataset import YOLODataset
+
+    class PackedYOLODataset(YOLODataset):
+        def __init__(self, *args, img_path=None, **kwargs):
+            self.pack = PackedDataset(os.path.join(pack_root, os.path.basename(os.path.normpath(img_path))))
+            super().__init__(*args, img_path=img_path, **kwargs)
+
+        def get_img_files(self, img_path):
+            return list(self.pack.files)
+
+        def get_labels(self):
+            labels = []
+            for i, path in enumerate(self.pack.files):
+                lb = self.pack.labels(i)
+                labels.append({
+                    "im_file": path,
+                    "shape": (self.pack.imgsz, self.pack.imgsz),
+                    "cls": lb[:, 0:1].copy(),
+                    "bboxes": lb[:, 1:5].copy(),
+                    "segments": [],
+                    "keypoints": None,
+                    "normalized": True,
+                    "bbox_format": "xywh",
+                })
+            return labels
+
+        def load_image(self, i, rect_mode=True):
+            # 像素已 letterbox 到缓存尺寸，imgsz 不同时再缩放
+            im = np.array(self.pack.image(i))
+            if self.imgsz != self.pack.imgsz:
+                im = cv2.resize(im, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+            hw = im.shape[:2]
+            if self.augment:
+                # 与基类一致：维护马赛克增强使用的图像缓冲区
+                self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw, hw
+                self.buffer.append(i)
+                if 1 < len(self.buffer) >= self.max_buffer_length:
+                    j = self.buffer.pop(0)
+                    if self.cache != "ram":
+                        self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+            return im, hw, hw
+
+    return PackedYOLODataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="打包 YOLO 数据集为内存映射训练缓存")
+    parser.add_argument("dataset", help="convert2YOLO.py 的输出目录（包含 train/val/test）")
+    parser.add_argument("output", help="打包输出目录")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--shard-size", type=int, default=1024, help="每个分片的图片数")
+    parser.add_argument("--workers", type=int, default=8, help="解码线程数")
+    args = parser.parse_args()
+
+    for subset in ["train", "val", "test"]:
+        images_dir = os.path.join(args.dataset, subset, "images")
+        if os.path.isdir(images_dir):
+            pack_subset(images_dir, os.path.join(args.output, subset), args.imgsz, args.shard_size, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,59 @@
 import os
 import random
-from shutil import copyfile
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# 划分方式：copy 复制文件；hardlink / reflink / symlink 不复制数据
+# （convert2YOLO 只处理 train / val / test 目录中实际存在的文件，因此不提供只写列表文件的方式）
+SPLIT_MODES = ("copy", "hardlink", "reflink", "symlink")
+FICLONE = 0x40049409  # Linux ioctl: 在支持写时复制的文件系统（btrfs、xfs 等）上共享数据块
+
+
+def reflink(src, dst):
+    # 创建写时复制的克隆文件，文件系统不支持时抛出 OSError
+    import fcntl
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+
+
+def place_file(src, dst, mode):
+    # 按指定方式在 dst 生成 src 的副本，目标已存在时跳过；链接失败时退回到复制，返回是否退回
+    if os.path.lexists(dst):
+        return False
+    try:
+        if mode == "hardlink":
+            os.link(src, dst)
+            return False
+        if mode == "symlink":
+            os.symlink(os.path.abspath(src), dst)
+            return False
+        if mode == "reflink" and sys.platform.startswith("linux"):
+            reflink(src, dst)
+            return False
+    except OSError:
+        pass
+    shutil.copyfile(src, dst)
+    return mode != "copy"
 
-def select_data(src_path, dst_train_path, dst_val_path, dst_test_path, num):
-    # 创建目标目录
-    os.makedirs(dst_train_path, exist_ok=True)
-    os.makedirs(dst_val_path, exist_ok=True)
-    os.makedirs(dst_test_path, exist_ok=True)
 
-    # 获取图片列表
-    images = [img for img in os.listdir(src_path) if img.endswith(".jpg")]
+def select_data(src_path, dst_train_path, dst_val_path, dst_test_path, num, mode="copy", workers=8):
+    """
+    从 src_path 中随机抽取 num 张图片，按 8:1:1 划分到训练、验证、测试集
+    :param mode: 见 SPLIT_MODES
+    :param workers: 复制文件的线程数
+    """
+    if mode not in SPLIT_MODES:
+        raise ValueError(f"未知的划分方式: {mode}")
+
+    # 获取图片列表：scandir 流式读取目录项，不逐个 stat；顺序与 os.listdir 相同，保证划分结果不变
+    with os.scandir(src_path) as entries:
+        images = [entry.name for entry in entries if entry.name.endswith(".jpg")]
     if len(images) < num:
         print(f"[警告] {src_path} 中图片不足 {num} 张，仅使用 {len(images)} 张")
         num = len(images)
@@ -27,19 +71,24 @@ def select_data(src_path, dst_train_path, dst_val_path, dst_test_path, num):
     val_imgs = selected[train_num:train_num + val_num]
     test_imgs = selected[train_num + val_num:]
 
-    # 拷贝文件
-    for img in train_imgs:
-        copyfile(os.path.join(src_path, img), os.path.join(dst_train_path, img))
-
-    for img in val_imgs:
-        copyfile(os.path.join(src_path, img), os.path.join(dst_val_path, img))
-
-    for img in test_imgs:
-        copyfile(os.path.join(src_path, img), os.path.join(dst_test_path, img))
+    splits = [(dst_train_path, train_imgs), (dst_val_path, val_imgs), (dst_test_path, test_imgs)]
+    # 创建目标目录
+    for dst_path, _ in splits:
+        os.makedirs(dst_path, exist_ok=True)
+    # 拷贝 / 链接文件
+    with ThreadPoolExecutor(workers) as executor:
+        jobs = [executor.submit(place_file, os.path.join(src_path, img), os.path.join(dst_path, img), mode)
+                for dst_path, imgs in splits for img in imgs]
+        fallback = sum(job.result() for job in jobs)
+    if fallback:
+        print(f"[警告] {fallback} 个文件无法以 {mode} 方式创建，已改为复制")
 
     print(f"{os.path.basename(src_path)}  训练: {len(train_imgs)} 验证: {len(val_imgs)} 测试: {len(test_imgs)}")
 
 if __name__ == "__main__":
+    # 划分方式，见 SPLIT_MODES；源目录与输出目录在同一磁盘时推荐 hardlink
+    mode = "copy"
+
     # CCPD19原始数据路径
     # root = "E:/BaiduNetdiskDownload/CCPD2019"
     # dataset_info = {
@@ -67,7 +116,8 @@ if __name__ == "__main__":
     #         dst_train_path=train_path,
     #         dst_val_path=val_path,
     #         dst_test_path=test_path,
-    #         num=num
+    #         num=num,
+    #         mode=mode
     #     )
 
     # CCPD20原始数据路径
@@ -90,5 +140,6 @@ if __name__ == "__main__":
             dst_train_path=train_path,
             dst_val_path=val_path,
             dst_test_path=test_path,
-            num=num
+            num=num,
+            mode=mode
         )